@@ -0,0 +1,121 @@
+"""
+Shared helpers for host-side benchmarks.
+
+Benchmarks run under the MicroPython unix port (preferred, gives exact
+allocation counts) or CPython:
+
+    micropython benchmarks/bench_dns.py
+    python3 benchmarks/bench_dns.py
+
+Importing this module puts src/ on the import path and, on CPython only,
+maps the MicroPython module names used by src/ to their CPython
+equivalents and adds the time.ticks_*(), asyncio.sleep_ms() and
+StreamReader.readinto() functions src/ relies on. patch_io() does the same for socket readiness waits.
+"""
+import gc
+import sys
+
+try:
+    import time
+    _ticks_us = time.ticks_us
+    _ticks_diff = time.ticks_diff
+    MICROPYTHON = True
+except AttributeError:
+    MICROPYTHON = False
+
+_here = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+sys.path.insert(0, _here + "/../src")
+
+if not MICROPYTHON:
+    import asyncio
+    import socket
+    sys.modules.setdefault("uasyncio", asyncio)
+    sys.modules.setdefault("usocket", socket)
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_us = lambda: int(time.monotonic() * 1000000)
+    time.ticks_add = lambda ticks, delta: ticks + delta
+    time.ticks_diff = lambda new, old: new - old
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+
+    async def _readinto(self, buf) -> int:
+        """uasyncio Stream.readinto() for CPython's StreamReader."""
+        data = await self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+    asyncio.StreamReader.readinto = _readinto
+
+
+async def _cpython_wait_readable(sock) -> None:
+    """Wait for socket data with the CPython event loop's reader callback."""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    fd = sock.fileno()  # Still valid for cleanup if sock is closed meanwhile
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await ready
+    finally:
+        loop.remove_reader(fd)
+
+
+def patch_io(module) -> None:
+    """
+    Make module._wait_readable work on CPython.
+
+    src/ waits on sockets through the uasyncio IO queue, which CPython's
+    asyncio does not have; on MicroPython this does nothing.
+
+    Args:
+        module: Imported module defining _wait_readable (e.g. dns_server).
+    """
+    if not MICROPYTHON:
+        module._wait_readable = _cpython_wait_readable
+
+
+def measure(fn, iterations: int = 2000) -> tuple:
+    """
+    Time fn() and measure heap allocated per call.
+
+    On MicroPython the GC is disabled and gc.mem_alloc() gives the exact
+    bytes allocated per call. On CPython tracemalloc reports the peak
+    transient allocation of one call instead.
+
+    Args:
+        fn: Zero-argument callable to benchmark.
+        iterations: Number of calls to time.
+
+    Returns:
+        tuple: (calls_per_second, bytes_allocated_per_call)
+    """
+    fn()  # Warm up caches and lazy attributes
+    gc.collect()
+    if MICROPYTHON:
+        gc.disable()
+        before = gc.mem_alloc()
+        start = _ticks_us()
+        for _ in range(iterations):
+            fn()
+        elapsed_us = _ticks_diff(_ticks_us(), start)
+        allocated = (gc.mem_alloc() - before) / iterations
+        gc.enable()
+        gc.collect()
+        return (iterations * 1000000 / max(elapsed_us, 1), allocated)
+
+    import time
+    import tracemalloc
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    allocated = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return (iterations / max(elapsed, 1e-9), allocated)
+
+
+def report(label: str, result: tuple, unit: str = "op") -> None:
+    """Print one benchmark result line."""
+    rate, allocated = result
+    print(f"{label:<28} {rate:>12.0f} {unit}/s {allocated:>10.1f} B/{unit}")
@@ -0,0 +1,69 @@
+"""
+DNS responder benchmark: legacy per-query packet building versus the
+batch-mode reply buffer and the cached reply path.
+
+Usage:
+    micropython benchmarks/bench_dns.py
+"""
+import _host
+from dns_server import DNSServer
+from logger import Logger, LogLevel
+
+NAMES = (
+    "connectivitycheck.gstatic.com",
+    "captive.apple.com",
+    "www.msftconnecttest.com",
+)
+
+
+def build_query(name: str, tid: int = 0x1234, qtype: int = 1) -> bytes:
+    """Build a single-question DNS query packet."""
+    packet = bytearray()
+    packet += bytes((tid >> 8, tid & 0xFF, 0x01, 0x00, 0, 1, 0, 0, 0, 0, 0, 0))
+    for label in name.split("."):
+        packet.append(len(label))
+        packet += label.encode()
+    packet += bytes((0, qtype >> 8, qtype & 0xFF, 0, 1))
+    return bytes(packet)
+
+
+class NullSocket:
+    """Socket stand-in that discards replies."""
+
+    def sendto(self, data, addr):
+        return len(data)
+
+
+def main() -> None:
+    Logger.set_level(LogLevel.NONE)
+    queries = [build_query(name) for name in NAMES]
+    legacy = DNSServer("192.168.4.1", batch=False)
+    batch = DNSServer("192.168.4.1", batch=True, cache_bytes=0)
+    cached = DNSServer("192.168.4.1", batch=True)
+    sock = NullSocket()
+    addr = ("192.168.4.2", 5353)
+
+    state = {"i": 0}
+
+    def next_query():
+        state["i"] = (state["i"] + 1) % len(queries)
+        return queries[state["i"]]
+
+    def run_legacy():
+        legacy._make_response(next_query())
+
+    def run_batch():
+        batch._write_response(next_query())
+
+    def run_cached():
+        cached._reply(sock, next_query(), addr)
+
+    print("DNS response building (per query)")
+    _host.report("legacy _make_response", _host.measure(run_legacy), "q")
+    _host.report("batch _write_response", _host.measure(run_batch), "q")
+    _host.report("cached _reply", _host.measure(run_cached), "q")
+    print(cached.get_stats())
+
+
+if __name__ == "__main__":
+    main()
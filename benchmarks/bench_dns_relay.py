@@ -0,0 +1,93 @@
+"""
+DNS relay benchmark against a local stand-in resolver.
+
+Starts a fake upstream resolver on 127.0.0.1:5301 that answers every
+query with one A record (TTL 300), points a DNSServer on 127.0.0.1:5300 at
+it, then measures the round trip of a forwarded (cold) lookup and of
+repeat lookups answered from the relay cache. The stand-in counts the
+queries it receives, so cached lookups that reach it show up.
+
+    micropython benchmarks/bench_dns_relay.py
+    python3 benchmarks/bench_dns_relay.py
+"""
+import _host
+import time
+import uasyncio as asyncio
+import usocket as socket
+import dns_server
+from dns_server import DNSServer
+from logger import Logger, LogLevel
+from bench_dns import build_query
+
+SERVER_PORT = 5300
+UPSTREAM_PORT = 5301
+REPEATS = 200
+
+upstream_queries = 0
+
+STANDIN_ANSWER = bytes((0xC0, 0x0C, 0, 1, 0, 1, 0, 0, 0x01, 0x2C,
+                        0, 4, 93, 184, 216, 34))
+
+
+async def standin_resolver(sock) -> None:
+    """Answer every query with a fixed A record."""
+    global upstream_queries
+    while True:
+        await dns_server._wait_readable(sock)
+        data, addr = sock.recvfrom(512)
+        upstream_queries += 1
+        reply = bytearray(data)
+        reply[2] = 0x81
+        reply[3] = 0x80
+        reply[7] = 1
+        sock.sendto(bytes(reply) + STANDIN_ANSWER, addr)
+
+
+async def lookup(client, query: bytes) -> int:
+    """Send one query to the relay and return the round trip in us."""
+    start = time.ticks_us()
+    client.sendto(query, ("127.0.0.1", SERVER_PORT))
+    await dns_server._wait_readable(client)
+    client.recvfrom(512)
+    return time.ticks_diff(time.ticks_us(), start)
+
+
+async def main() -> None:
+    Logger.set_level(LogLevel.WARNING)
+
+    upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    upstream.setblocking(False)
+    upstream.bind(("127.0.0.1", UPSTREAM_PORT))
+    standin = asyncio.create_task(standin_resolver(upstream))
+
+    dns = DNSServer("192.168.4.1", port=SERVER_PORT)
+    dns.set_upstream("127.0.0.1", UPSTREAM_PORT)
+    dns.start()
+
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.setblocking(False)
+    client.bind(("127.0.0.1", 0))
+    await asyncio.sleep_ms(10)
+
+    query = build_query("example.com")
+    cold = await lookup(client, query)
+    total = 0
+    for _ in range(REPEATS):
+        total += await lookup(client, query)
+
+    print("DNS relay round trip")
+    print(f"forwarded (cold)   {cold:>8} us")
+    print(f"cached (avg of {REPEATS}) {total // REPEATS:>8} us")
+    print(f"upstream queries   {upstream_queries:>8}")
+    print(dns.get_stats())
+
+    dns.stop()
+    standin.cancel()
+    await asyncio.sleep_ms(10)
+    client.close()
+    upstream.close()
+
+
+if __name__ == "__main__":
+    _host.patch_io(dns_server)
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+HTTP request parsing benchmark: the original readline/dict parser versus
+the buffer-backed RequestParser.
+
+Each parser is fed a captive-portal probe (GET, no body) and a provisioning
+form submission (POST) from an in-memory stream. The RequestParser is
+reused across requests, as on a keep-alive connection.
+
+Usage:
+    micropython benchmarks/bench_http.py
+"""
+import _host
+from web_server import RequestParser
+from logger import Logger, LogLevel
+
+PROBE = (
+    b"GET /generate_204 HTTP/1.1\r\n"
+    b"Host: connectivitycheck.gstatic.com\r\n"
+    b"User-Agent: Dalvik/2.1.0 (Linux; U; Android 14; Pixel 7)\r\n"
+    b"Accept-Encoding: gzip\r\n"
+    b"Connection: Keep-Alive\r\n"
+    b"\r\n"
+)
+
+FORM = (
+    b"POST /configure HTTP/1.1\r\n"
+    b"Host: 192.168.4.1\r\n"
+    b"User-Agent: Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)\r\n"
+    b"Content-Type: application/x-www-form-urlencoded\r\n"
+    b"Content-Length: 37\r\n"
+    b"Origin: http://192.168.4.1\r\n"
+    b"\r\n"
+    b"ssid=Office+WiFi&password=s3cret%21pw"
+)
+
+
+class MemoryStream:
+    """In-memory stand-in for a uasyncio StreamReader."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def rewind(self) -> None:
+        self._pos = 0
+
+    async def readline(self) -> bytes:
+        end = self._data.find(b"\n", self._pos)
+        end = len(self._data) if end < 0 else end + 1
+        line = self._data[self._pos:end]
+        self._pos = end
+        return line
+
+    async def read(self, n: int) -> bytes:
+        chunk = self._data[self._pos:self._pos + n]
+        self._pos += len(chunk)
+        return chunk
+
+    async def readinto(self, buf) -> int:
+        n = min(len(buf), len(self._data) - self._pos)
+        buf[0:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def run(coro):
+    """Run a coroutine that never suspends to completion."""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("coroutine suspended")
+
+
+async def legacy_read_request(reader) -> dict:
+    """The request parsing from WebServer._handle_client in 1.6.0."""
+    request_line = await reader.readline()
+    request_line = request_line.decode('utf-8').strip()
+    parts = request_line.split(" ", 2)
+    method, path = parts[0], parts[1]
+
+    headers = {}
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if not line or line == b'\r\n':
+            break
+        line_str = line.decode('utf-8').strip()
+        if ':' in line_str:
+            key, value = line_str.split(":", 1)
+            key = key.lower().strip()
+            headers[key] = value.strip()
+            if key == 'content-length':
+                content_length = min(int(value.strip()), 1024)
+
+    body = ""
+    if method == "POST" and content_length > 0:
+        body_bytes = b""
+        remaining = content_length
+        while remaining > 0:
+            chunk = await reader.read(remaining)
+            if not chunk:
+                break
+            body_bytes += chunk
+            remaining -= len(chunk)
+        body = body_bytes.decode('utf-8')
+
+    return {"method": method, "path": path, "headers": headers, "body": body}
+
+
+async def parser_read_request(parser):
+    """Read one request with RequestParser, as WebServer does."""
+    await parser.wait_request_line()
+    request = await parser.read_head()
+    if request.content_length:
+        await parser.read_body(request)
+    return request
+
+
+def main() -> None:
+    Logger.set_level(LogLevel.NONE)
+    print("HTTP request parsing (per request)")
+    for label, data in (("probe", PROBE), ("form", FORM)):
+        stream = MemoryStream(data)
+        parser = RequestParser(stream)
+
+        def legacy():
+            stream.rewind()
+            run(legacy_read_request(stream))
+
+        def buffered():
+            stream.rewind()
+            run(parser_read_request(parser))
+
+        _host.report(f"legacy {label}", _host.measure(legacy), "req")
+        _host.report(f"RequestParser {label}", _host.measure(buffered), "req")
+
+
+if __name__ == "__main__":
+    main()
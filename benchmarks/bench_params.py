@@ -0,0 +1,88 @@
+"""
+Form/query decoding benchmark: the original str-splitting parser versus
+the byte-level parse_params.
+
+Both parsers decode two 1 KB form bodies: a mixed one (a few
+percent-encoded UTF-8 fields among plain ASCII ones) and an escaped one
+(a single fully percent-encoded value, where the legacy parser's string
+concatenation goes quadratic). The legacy run includes the body decode
+to str that WebServer used to do before parsing.
+
+Usage:
+    micropython benchmarks/bench_params.py
+"""
+import _host
+from web_server import parse_params
+from logger import Logger, LogLevel
+
+
+def build_body(size: int = 1024) -> bytes:
+    """Build a URL-encoded form body of roughly size bytes."""
+    fields = [
+        b"ssid=%E5%8F%B0%E5%8C%97+Home+%F0%9F%93%B6",
+        b"password=s3cret%21pw+with+spaces%26symbols",
+    ]
+    i = 0
+    length = sum(len(f) + 1 for f in fields)
+    while length < size:
+        field = b"field%d=value+%d+plain+ascii+text" % (i, i)
+        fields.append(field)
+        length += len(field) + 1
+        i += 1
+    return b"&".join(fields)[:size]
+
+
+def build_escaped_body(size: int = 1024) -> bytes:
+    """Build a form body whose value is entirely percent-encoded UTF-8."""
+    body = b"ssid="
+    while len(body) + 9 <= size:
+        body += b"%E5%8F%B0"
+    return body
+
+
+def legacy_parse_params(body: str) -> dict:
+    """The form parsing from WebServer._parse_params in 1.6.0."""
+    params = {}
+    if not body:
+        return params
+    pairs = body.split('&')
+    for pair in pairs:
+        if '=' in pair:
+            key, value = pair.split('=', 1)
+            value = value.replace('+', ' ')
+            parts = value.split('%')
+            decoded_value = parts[0]
+            for part in parts[1:]:
+                if len(part) >= 2:
+                    try:
+                        char_code = int(part[:2], 16)
+                        decoded_value += chr(char_code) + part[2:]
+                    except ValueError:
+                        decoded_value += '%' + part
+                else:
+                    decoded_value += '%' + part
+            params[key] = decoded_value
+    return params
+
+
+def main() -> None:
+    Logger.set_level(LogLevel.NONE)
+    mixed = build_body()
+    print(f"legacy ssid:  {legacy_parse_params(mixed.decode('utf-8'))['ssid']!r}")
+    print(f"decoder ssid: {parse_params(mixed)['ssid']!r}")
+
+    print("Form decoding (per 1 KB body)")
+    for label, body in (("mixed", mixed), ("escaped", build_escaped_body())):
+
+        def legacy():
+            legacy_parse_params(body.decode('utf-8'))
+
+        def decoder():
+            parse_params(body)
+
+        _host.report(f"legacy {label}", _host.measure(legacy, 500), "body")
+        _host.report(f"parse_params {label}", _host.measure(decoder, 500), "body")
+
+
+if __name__ == "__main__":
+    main()
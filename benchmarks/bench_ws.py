@@ -0,0 +1,90 @@
+"""
+WebSocket throughput benchmark over loopback.
+
+Starts a WebServer with an echo socket on 127.0.0.1:8765 and measures,
+for several message sizes:
+    - round trip: send one message, wait for its echo;
+    - burst: send BURST messages, then read all echoes, which lets the
+      server batch its replies into one flush per event-loop tick.
+The server's drains per echoed message show how well replies batch.
+
+    micropython benchmarks/bench_ws.py
+    python3 benchmarks/bench_ws.py
+"""
+import _host
+import time
+import uasyncio as asyncio
+from web_server import WebServer
+from logger import Logger, LogLevel
+from ws_client import WSClient
+
+PORT = 8765
+COUNT = 200
+BURST = 8
+SIZES = (16, 128, 1000)
+
+drains = 0
+
+
+async def echo(ws, request) -> None:
+    """Send every message straight back, counting the server's drains."""
+    drain = ws._writer.drain
+
+    async def counted_drain():
+        global drains
+        drains += 1
+        await drain()
+
+    ws._writer.drain = counted_drain
+    while True:
+        message = await ws.receive()
+        if message is None:
+            break
+        ws.send(message)
+
+
+def report(label: str, messages: int, size: int, elapsed_us: int,
+           flushes: int) -> None:
+    """Print messages/s, payload KB/s (both directions) and drains/msg."""
+    rate = messages * 1000000 / max(elapsed_us, 1)
+    print(f"{label:<20} {rate:>10.0f} msg/s {rate * size * 2 / 1024:>10.1f} KB/s"
+          f" {flushes / messages:>6.2f} drains/msg")
+
+
+async def main() -> None:
+    Logger.set_level(LogLevel.WARNING)
+    server = WebServer()
+    server.add_websocket("/echo", echo)
+    await server.start("127.0.0.1", PORT)
+
+    client = WSClient()
+    await client.connect("127.0.0.1", PORT, "/echo")
+
+    print("WebSocket echo over loopback")
+    for size in SIZES:
+        payload = "x" * size
+
+        start, before = time.ticks_us(), drains
+        for _ in range(COUNT):
+            await client.send(payload)
+            await client.receive()
+        report(f"round trip {size} B", COUNT, size,
+               time.ticks_diff(time.ticks_us(), start), drains - before)
+
+        start, before = time.ticks_us(), drains
+        for _ in range(COUNT // BURST):
+            for _ in range(BURST):
+                await client.send(payload)
+            for _ in range(BURST):
+                await client.receive()
+        report(f"burst {size} B", COUNT // BURST * BURST, size,
+               time.ticks_diff(time.ticks_us(), start), drains - before)
+
+    await client.close()
+    await asyncio.sleep(0.05)  # Let the server side finish the close
+    server.stop()
+    print(server.get_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""
+Minimal WebSocket client for testing WebServer WebSockets from a host.
+
+Runs under CPython or the MicroPython unix port. As a script it connects
+to the dashboard of a device in provisioning mode, optionally sends one
+command, and prints the messages it receives:
+
+    python3 benchmarks/ws_client.py 192.168.4.1
+    python3 benchmarks/ws_client.py 192.168.4.1 reconnect
+"""
+import binascii
+import hashlib
+import os
+import sys
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _mask(payload: bytes, key: bytes) -> bytes:
+    """XOR payload with the 4-byte masking key using big-int arithmetic."""
+    n = len(payload)
+    if not n:
+        return b""
+    stream = (key * (n // 4 + 1))[:n]
+    value = int.from_bytes(payload, "big") ^ int.from_bytes(stream, "big")
+    return value.to_bytes(n, "big")
+
+
+class WSClient:
+    """WebSocket client sending masked frames, as browsers do."""
+
+    def __init__(self):
+        self._reader = None
+        self._writer = None
+
+    async def connect(self, host: str, port: int = 80, path: str = "/ws") -> None:
+        """
+        Open the connection and perform the upgrade handshake.
+
+        Raises:
+            OSError: If the server does not accept the upgrade.
+        """
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        key = binascii.b2a_base64(os.urandom(16)).strip()
+        self._writer.write(
+            b"GET " + path.encode() + b" HTTP/1.1\r\n"
+            b"Host: " + host.encode() + b"\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n"
+            b"Sec-WebSocket-Key: " + key + b"\r\n"
+            b"Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        await self._writer.drain()
+
+        status = await self._reader.readline()
+        accept = None
+        while True:
+            line = await self._reader.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-accept":
+                accept = value.strip()
+        expected = binascii.b2a_base64(hashlib.sha1(key + WS_GUID).digest()).strip()
+        if b" 101 " not in status or accept != expected:
+            raise OSError(f"Upgrade refused: {status!r}")
+
+    async def send(self, message, opcode: int = None) -> None:
+        """Send a text (str) or binary (bytes) message in one frame."""
+        if opcode is None:
+            opcode = 0x1 if isinstance(message, str) else 0x2
+        if isinstance(message, str):
+            message = message.encode()
+        n = len(message)
+        if n < 126:
+            head = bytes((0x80 | opcode, 0x80 | n))
+        elif n < 65536:
+            head = bytes((0x80 | opcode, 0x80 | 126, n >> 8, n & 0xFF))
+        else:
+            head = bytes((0x80 | opcode, 0x80 | 127)) + n.to_bytes(8, "big")
+        key = os.urandom(4)
+        self._writer.write(head + key + _mask(message, key))
+        await self._writer.drain()
+
+    async def receive(self):
+        """
+        Receive the next data message (control frames are skipped).
+
+        Returns:
+            str, bytes, or None once the server closed the socket.
+        """
+        while True:
+            try:
+                head = await self._reader.readexactly(2)
+            except EOFError:
+                return None
+            opcode = head[0] & 0x0F
+            n = head[1] & 0x7F
+            if n == 126:
+                ext = await self._reader.readexactly(2)
+                n = (ext[0] << 8) | ext[1]
+            elif n == 127:
+                n = int.from_bytes(await self._reader.readexactly(8), "big")
+            payload = await self._reader.readexactly(n) if n else b""
+            if opcode == 0x1:
+                return payload.decode()
+            if opcode == 0x2:
+                return payload
+            if opcode == 0x8:
+                return None
+
+    async def close(self) -> None:
+        """Send a normal close frame and close the connection."""
+        try:
+            await self.send(b"\x03\xe8", 0x8)
+        except OSError:
+            pass
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def main(host: str, command: str = None) -> None:
+    client = WSClient()
+    await client.connect(host)
+    if command:
+        await client.send('{"cmd": "%s"}' % command)
+    while True:
+        message = await client.receive()
+        if message is None:
+            break
+        print(message)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: ws_client.py <host> [reconnect|info]")
+    else:
+        asyncio.run(main(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))
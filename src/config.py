@@ -9,8 +9,23 @@ class WiFiConfig:
         MAX_RETRIES: Maximum connection attempts before entering FAIL state.
         CONNECT_TIMEOUT: Seconds to wait for connection per attempt.
         RETRY_DELAY: Seconds to wait between retry attempts.
+        RETRY_POLICY: Object deciding retry waits and attempt timeouts
+            (e.g. retry_policy.ExponentialBackoff()), or None for a fixed
+            RETRY_DELAY and CONNECT_TIMEOUT.
         FAIL_RECOVERY_DELAY: Seconds in FAIL state before auto-recovery.
         HEALTH_CHECK_INTERVAL: Seconds between connection health checks.
+        FAST_RECONNECT: Join the access point (BSSID and channel) of the
+            last successful connection directly on the first attempt,
+            skipping the full-channel scan.
+        FAST_CONNECT_TIMEOUT: Seconds to wait for that first attempt
+            before falling back to a normal connect.
+        STATIC_IP: (ip, subnet, gateway, dns) tuple applied instead of
+            DHCP, or None to use DHCP.
+        REUSE_LEASE: Apply the last DHCP address directly on the first
+            attempt while it is younger than LEASE_LIFETIME and its DNS
+            server answers, skipping the DHCP exchange.
+        LEASE_LIFETIME: Seconds a saved DHCP address may be reused; keep
+            it below the router's lease time.
         AP_SSID: Default SSID for provisioning AP mode.
         AP_PASSWORD: Default password for provisioning AP mode.
         AP_IP: IP address for AP mode.
@@ -19,8 +34,14 @@ class WiFiConfig:
     MAX_RETRIES = 5
     CONNECT_TIMEOUT = 15
     RETRY_DELAY = 2
+    RETRY_POLICY = None
     FAIL_RECOVERY_DELAY = 30
     HEALTH_CHECK_INTERVAL = 2
+    FAST_RECONNECT = True
+    FAST_CONNECT_TIMEOUT = 5
+    STATIC_IP = None
+    REUSE_LEASE = False
+    LEASE_LIFETIME = 3600
 
     # AP Mode Settings
     AP_SSID = "Picore-W-Setup"
@@ -36,7 +57,13 @@ class WiFiConfig:
         health_check_interval: int = None,
         ap_ssid: str = None,
         ap_password: str = None,
-        ap_ip: str = None
+        ap_ip: str = None,
+        fast_reconnect: bool = None,
+        fast_connect_timeout: int = None,
+        static_ip: tuple = None,
+        reuse_lease: bool = None,
+        lease_lifetime: int = None,
+        retry_policy=None
     ):
         """
         Create a configuration instance with optional overrides.
@@ -50,12 +77,24 @@ class WiFiConfig:
             ap_ssid: Override AP_SSID (default "Picore-W-Setup").
             ap_password: Override AP_PASSWORD.
             ap_ip: Override AP_IP (default "192.168.4.1").
+            fast_reconnect: Override FAST_RECONNECT (default True).
+            fast_connect_timeout: Override FAST_CONNECT_TIMEOUT (default 5).
+            static_ip: Override STATIC_IP (default None, i.e. DHCP).
+            reuse_lease: Override REUSE_LEASE (default False).
+            lease_lifetime: Override LEASE_LIFETIME (default 3600).
+            retry_policy: Override RETRY_POLICY (default None).
         """
         self.max_retries = max_retries if max_retries is not None else WiFiConfig.MAX_RETRIES
         self.connect_timeout = connect_timeout if connect_timeout is not None else WiFiConfig.CONNECT_TIMEOUT
         self.retry_delay = retry_delay if retry_delay is not None else WiFiConfig.RETRY_DELAY
+        self.retry_policy = retry_policy if retry_policy is not None else WiFiConfig.RETRY_POLICY
         self.fail_recovery_delay = fail_recovery_delay if fail_recovery_delay is not None else WiFiConfig.FAIL_RECOVERY_DELAY
         self.health_check_interval = health_check_interval if health_check_interval is not None else WiFiConfig.HEALTH_CHECK_INTERVAL
+        self.fast_reconnect = fast_reconnect if fast_reconnect is not None else WiFiConfig.FAST_RECONNECT
+        self.fast_connect_timeout = fast_connect_timeout if fast_connect_timeout is not None else WiFiConfig.FAST_CONNECT_TIMEOUT
+        self.static_ip = static_ip if static_ip is not None else WiFiConfig.STATIC_IP
+        self.reuse_lease = reuse_lease if reuse_lease is not None else WiFiConfig.REUSE_LEASE
+        self.lease_lifetime = lease_lifetime if lease_lifetime is not None else WiFiConfig.LEASE_LIFETIME
         self.ap_ssid = ap_ssid if ap_ssid is not None else WiFiConfig.AP_SSID
         self.ap_password = ap_password if ap_password is not None else WiFiConfig.AP_PASSWORD
         self.ap_ip = ap_ip if ap_ip is not None else WiFiConfig.AP_IP
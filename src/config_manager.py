@@ -3,7 +3,16 @@ import os
 import time
 
 CONFIG_FILE = "wifi_config.json"
-CONFIG_VERSION = 2
+CONFIG_VERSION = 4
+
+# Rewrite an unchanged last-good association after this many seconds
+LAST_GOOD_REFRESH = 24 * 3600
+
+# time.time() below this was never set (the RTC restarts at 2021-01-01)
+CLOCK_SET_AFTER = 1704067200  # 2024-01-01 UTC
+
+# Known networks kept; saving another drops the least useful one
+MAX_NETWORKS = 8
 
 
 class ConfigManager:
@@ -14,6 +23,9 @@ class ConfigManager:
     for forward compatibility and data migration.
     """
 
+    # Successes not written yet (see record_success()): ssid -> [count, time]
+    _unsaved = {}
+
     @staticmethod
     def _migrate_v1_to_v2(data: dict) -> dict:
         """
@@ -33,6 +45,46 @@ class ConfigManager:
             }
         }
 
+    @staticmethod
+    def _migrate_v2_to_v3(data: dict) -> dict:
+        """
+        Migrate v2 config to v3 format.
+
+        Args:
+            data: Config in v2 format.
+
+        Returns:
+            Config in v3 format with empty last_good, lease and retry
+            sections.
+        """
+        data["version"] = 3
+        data["last_good"] = {}
+        data["lease"] = {}
+        data["retry"] = {}
+        return data
+
+    @staticmethod
+    def _migrate_v3_to_v4(data: dict) -> dict:
+        """
+        Migrate v3 config (single wifi section) to v4 format.
+
+        Args:
+            data: Config in v3 format.
+
+        Returns:
+            Config in v4 format with a networks list.
+        """
+        wifi = data.pop("wifi", {})
+        data["version"] = 4
+        data["networks"] = []
+        if wifi.get("ssid"):
+            data["networks"].append({
+                "ssid": wifi["ssid"],
+                "password": wifi.get("password", ""),
+                "priority": 0
+            })
+        return data
+
     @staticmethod
     def _migrate(data: dict) -> dict:
         """
@@ -50,6 +102,14 @@ class ConfigManager:
             data = ConfigManager._migrate_v1_to_v2(data)
             version = 2
 
+        if version == 2:
+            data = ConfigManager._migrate_v2_to_v3(data)
+            version = 3
+
+        if version == 3:
+            data = ConfigManager._migrate_v3_to_v4(data)
+            version = 4
+
         return data
 
     @staticmethod
@@ -61,8 +121,9 @@ class ConfigManager:
         The migrated config is saved back to ensure persistence.
 
         Returns:
-            dict: Configuration data with 'wifi' containing 'ssid' and
-                  'password', or None if file doesn't exist or is invalid.
+            dict: Configuration data with 'networks', a list of dicts with
+                  'ssid' and 'password', or None if file doesn't exist or
+                  is invalid.
         """
         try:
             with open(CONFIG_FILE, "r") as f:
@@ -83,30 +144,54 @@ class ConfigManager:
     @staticmethod
     def get_wifi_credentials() -> tuple:
         """
-        Get WiFi credentials from config.
+        Get the credentials of the highest-priority known network.
 
         Returns:
             tuple: (ssid, password) or (None, None) if not configured.
         """
-        config = ConfigManager.load_config()
-        if config and "wifi" in config:
-            wifi = config["wifi"]
-            return (wifi.get("ssid"), wifi.get("password"))
-        elif config and "ssid" in config:
-            return (config.get("ssid"), config.get("password"))
+        networks = ConfigManager.get_networks()
+        if networks:
+            return (networks[0]["ssid"], networks[0]["password"])
         return (None, None)
 
+    @staticmethod
+    def get_networks() -> list:
+        """
+        Get all known networks, highest priority first.
+
+        Returns:
+            list: Dicts with 'ssid', 'password', 'priority' and, once
+                  connected, 'successes' and 'last_success' (seconds).
+                  Empty if not configured.
+        """
+        config = ConfigManager.load_config()
+        networks = config.get("networks", []) if config else []
+        ConfigManager._add_unsaved(networks)
+        return sorted(networks, key=lambda n: n.get("priority", 0), reverse=True)
+
+    @staticmethod
+    def _add_unsaved(networks: list) -> None:
+        """Add the successes kept in RAM to known network dicts."""
+        for network in networks:
+            unsaved = ConfigManager._unsaved.get(network.get("ssid"))
+            if unsaved:
+                network["successes"] = network.get("successes", 0) + unsaved[0]
+                network["last_success"] = max(network.get("last_success", 0), unsaved[1])
+
     @staticmethod
     def _save_raw(data: dict) -> bool:
         """
         Save raw config data to file with verification.
 
+        Successes kept in RAM are written along with it.
+
         Args:
             data: Complete config dict to save.
 
         Returns:
             bool: True if save and verification succeeded.
         """
+        ConfigManager._add_unsaved(data.get("networks", ()))
         try:
             with open(CONFIG_FILE, "w") as f:
                 json.dump(data, f)
@@ -119,6 +204,7 @@ class ConfigManager:
                     print("ConfigManager: Verification FAILED."
                           " Content mismatch.")
                     return False
+                ConfigManager._unsaved = {}
                 return True
         except OSError as e:
             print(f"ConfigManager: Error saving config: {e}")
@@ -128,29 +214,261 @@ class ConfigManager:
             return False
 
     @staticmethod
-    def save_config(ssid: str, password: str) -> bool:
+    def save_config(ssid: str, password: str, priority: int = None) -> bool:
         """
-        Save WiFi credentials to the JSON file with verification.
+        Add or update a known network in the JSON file with verification.
+
+        Other known networks are kept. When MAX_NETWORKS are stored, the
+        one with the lowest priority and oldest success is replaced.
 
         Args:
             ssid: The WiFi SSID to save.
             password: The WiFi password to save.
+            priority: Ranking bonus when several known networks are in
+                range (default: unchanged, or 0 for a new network).
 
         Returns:
             bool: True if save was successful and verified, False otherwise.
         """
         existing = ConfigManager.load_config()
         if existing and existing.get("version") == CONFIG_VERSION:
-            existing["wifi"] = {"ssid": ssid, "password": password}
             data = existing
+            # New credentials start a fresh failure count
+            data["retry"] = {}
         else:
             data = {
                 "version": CONFIG_VERSION,
-                "wifi": {"ssid": ssid, "password": password}
+                "networks": [],
+                "last_good": {},
+                "lease": {},
+                "retry": {}
             }
 
+        networks = data["networks"]
+        entry = ConfigManager._find_network(data, ssid)
+        if entry is None:
+            if len(networks) >= MAX_NETWORKS:
+                networks.remove(min(networks, key=lambda n: (
+                    n.get("priority", 0), n.get("last_success", 0))))
+            entry = {"ssid": ssid, "priority": 0}
+            networks.append(entry)
+        entry["password"] = password
+        if priority is not None:
+            entry["priority"] = priority
+
         return ConfigManager._save_raw(data)
 
+    @staticmethod
+    def remove_network(ssid: str) -> bool:
+        """
+        Forget a known network.
+
+        Args:
+            ssid: Network to remove.
+
+        Returns:
+            bool: True if it was removed and the file saved.
+        """
+        config = ConfigManager.load_config()
+        entry = ConfigManager._find_network(config, ssid) if config else None
+        if entry is None:
+            return False
+        config["networks"].remove(entry)
+        for section in ("last_good", "lease"):
+            if config.get(section, {}).get("ssid") == ssid:
+                config[section] = {}
+        return ConfigManager._save_raw(config)
+
+    @staticmethod
+    def _find_network(config: dict, ssid: str) -> dict:
+        """Get the networks entry for ssid, or None."""
+        for network in config.get("networks", []):
+            if network.get("ssid") == ssid:
+                return network
+        return None
+
+    @staticmethod
+    def get_last_good(ssid: str = None) -> dict:
+        """
+        Get the last successful association.
+
+        Args:
+            ssid: Network the association must belong to (default: any).
+
+        Returns:
+            dict: 'ssid', 'bssid' (hex string), 'channel' (int or None)
+                  and 'time' (seconds), or None if nothing is stored for
+                  this SSID.
+        """
+        config = ConfigManager.load_config()
+        last = config.get("last_good") if config else None
+        if last and last.get("bssid") and (ssid is None or last.get("ssid") == ssid):
+            return last
+        return None
+
+    @staticmethod
+    def record_success(ssid: str, bssid: str = None, channel: int = None,
+                       count: bool = True) -> bool:
+        """
+        Record a successful connection, and its access point and channel.
+
+        Counts the success in the known network's 'successes' and
+        'last_success' and, if bssid is given, updates the last-good
+        association. To spare the flash, the file is only rewritten when
+        the association changed or the stored 'last_success' is older than
+        LAST_GOOD_REFRESH; otherwise the success is kept in RAM (counted by
+        get_networks()) and written with the next save.
+
+        Args:
+            ssid: Connected network.
+            bssid: Access point MAC address as a hex string, if known.
+            channel: Radio channel, or None if unknown.
+            count: Count a success; False only updates the association
+                (e.g. learned from a scan after the success was counted).
+
+        Returns:
+            bool: True if the success is recorded (written or kept in RAM).
+        """
+        config = ConfigManager.load_config()
+        if not config or config.get("version") != CONFIG_VERSION:
+            return False
+        now = time.time()
+        network = ConfigManager._find_network(config, ssid)
+        last = config.get("last_good") or {}
+        unchanged = bssid is None or (
+            last.get("ssid") == ssid and last.get("bssid") == bssid
+            and last.get("channel") == channel)
+        recent = network is None or 0 <= now - network.get("last_success", 0) < LAST_GOOD_REFRESH
+        if unchanged and (recent or not count):
+            if network is not None and count:
+                unsaved = ConfigManager._unsaved.setdefault(ssid, [0, 0])
+                unsaved[0] += 1
+                unsaved[1] = now
+            return True
+        if network is not None and count:
+            network["successes"] = network.get("successes", 0) + 1
+            network["last_success"] = now
+        if bssid is not None:
+            config["last_good"] = {
+                "ssid": ssid, "bssid": bssid, "channel": channel, "time": now
+            }
+        return ConfigManager._save_raw(config)
+
+    @staticmethod
+    def clear_last_good() -> bool:
+        """
+        Forget the stored association (e.g. after it stopped working).
+
+        Returns:
+            bool: True if nothing is stored anymore.
+        """
+        return ConfigManager._clear_section("last_good")
+
+    @staticmethod
+    def get_lease(ssid: str) -> dict:
+        """
+        Get the last DHCP lease obtained on a network.
+
+        Args:
+            ssid: Network the lease must belong to.
+
+        Returns:
+            dict: 'ssid', 'ifconfig' ([ip, subnet, gateway, dns]) and
+                  'time' (seconds when obtained, None if the clock was not
+                  set), or None if nothing is stored for this SSID.
+        """
+        config = ConfigManager.load_config()
+        lease = config.get("lease") if config else None
+        if lease and lease.get("ssid") == ssid and lease.get("ifconfig"):
+            return lease
+        return None
+
+    @staticmethod
+    def save_lease(ssid: str, ifconfig: tuple) -> bool:
+        """
+        Remember an address obtained via DHCP, stamped with the current time.
+
+        The time is only stored once the clock has been set (e.g. with
+        ntptime), since the unset RTC restarts at every power cycle.
+
+        Args:
+            ssid: Network the lease was obtained on.
+            ifconfig: (ip, subnet, gateway, dns) from wlan.ifconfig().
+
+        Returns:
+            bool: True if the lease was saved.
+        """
+        config = ConfigManager.load_config()
+        if not config or config.get("version") != CONFIG_VERSION:
+            return False
+        now = time.time()
+        config["lease"] = {
+            "ssid": ssid, "ifconfig": list(ifconfig),
+            "time": now if now >= CLOCK_SET_AFTER else None
+        }
+        return ConfigManager._save_raw(config)
+
+    @staticmethod
+    def clear_lease() -> bool:
+        """
+        Forget the stored lease (e.g. after it failed verification).
+
+        Returns:
+            bool: True if nothing is stored anymore.
+        """
+        return ConfigManager._clear_section("lease")
+
+    @staticmethod
+    def get_failures() -> int:
+        """
+        Get the number of consecutive failed connection attempts.
+
+        Returns:
+            int: Failures since the last successful connection, counted
+                 across reboots (0 if none or no config).
+        """
+        config = ConfigManager.load_config()
+        retry = config.get("retry") if config else None
+        return retry.get("failures", 0) if retry else 0
+
+    @staticmethod
+    def set_failures(count: int) -> bool:
+        """
+        Persist the consecutive failure count (written only on change).
+
+        Args:
+            count: Failures since the last successful connection.
+
+        Returns:
+            bool: True if the stored count matches afterwards.
+        """
+        if count == 0:
+            return ConfigManager._clear_section("retry")
+        config = ConfigManager.load_config()
+        if not config or config.get("version") != CONFIG_VERSION:
+            return False
+        if (config.get("retry") or {}).get("failures") == count:
+            return True
+        config["retry"] = {"failures": count}
+        return ConfigManager._save_raw(config)
+
+    @staticmethod
+    def _clear_section(name: str) -> bool:
+        """
+        Empty a config section, writing the file only if it had content.
+
+        Args:
+            name: Section key, e.g. 'last_good'.
+
+        Returns:
+            bool: True if the section is empty afterwards.
+        """
+        config = ConfigManager.load_config()
+        if not config or not config.get(name):
+            return True
+        config[name] = {}
+        return ConfigManager._save_raw(config)
+
     @staticmethod
     def delete_config() -> bool:
         """
@@ -160,6 +478,7 @@ class ConfigManager:
             bool: True if the file was deleted, False if it didn't exist
                   or an error occurred.
         """
+        ConfigManager._unsaved = {}
         try:
             os.remove(CONFIG_FILE)
             return True
@@ -0,0 +1,126 @@
+"""
+Live WebSocket dashboard for WiFiManager.
+Streams log output and debug info changes, and accepts control commands.
+"""
+import json
+import uasyncio as asyncio
+from config_manager import ConfigManager
+from logger import Logger
+from websocket import WS_CLOSE_GOING_AWAY, WS_OP_TEXT, encode_frame
+
+DASHBOARD_PATH = "/ws"
+DASHBOARD_INTERVAL = 2  # Seconds between debug info change checks
+
+# Debug info fields never sent to dashboard clients
+DASHBOARD_HIDDEN = ("ap_password",)
+
+
+class Dashboard:
+    """
+    Serves a WebSocket dashboard on the WiFiManager's web server.
+
+    Messages to the client are JSON objects:
+        {"type": "info", "changes": {...}}   get_debug_info() fields that
+                                             changed (all on connect)
+        {"type": "log", "level": ..., "module": ..., "msg": ...}
+        {"type": "ack", "cmd": ..., "ok": ...}
+
+    Clients send {"cmd": "reconnect"} (reconnect to the best known
+    network) or {"cmd": "info"} (resend all debug info).
+
+    The web server only runs while the AP is up, so the dashboard is
+    reachable in provisioning mode. Reconnecting takes the AP down, so the
+    acknowledgement and a close frame are sent before it starts.
+    """
+
+    def __init__(self, wifi_manager, path: str = DASHBOARD_PATH,
+                 interval: int = DASHBOARD_INTERVAL):
+        """
+        Register the dashboard on the manager's web server.
+
+        Args:
+            wifi_manager: WiFiManager instance to report on and control.
+            path: WebSocket URL path (default '/ws').
+            interval: Seconds between debug info change checks.
+        """
+        self._log = Logger("Dashboard")
+        self._wm = wifi_manager
+        self._interval = interval
+        self._clients = []
+        wifi_manager.web_server.add_websocket(path, self._serve)
+        Logger.add_hook(self._on_log)
+
+    def _on_log(self, level: int, module: str, msg: str) -> None:
+        """Send a log line to all clients, encoded once (Logger hook)."""
+        if not self._clients:
+            return
+        name = Logger._level_names[level] if level < len(Logger._level_names) else '?'
+        frame = encode_frame(WS_OP_TEXT, json.dumps(
+            {"type": "log", "level": name, "module": module, "msg": msg}
+        ).encode())
+        for ws in self._clients:
+            ws.send_frame(frame)
+
+    async def _serve(self, ws, request) -> None:
+        """Run one dashboard connection."""
+        self._clients.append(ws)
+        state = {"last": {}}
+        pusher = asyncio.create_task(self._push_info(ws, state))
+        try:
+            while True:
+                message = await ws.receive()
+                if message is None:
+                    break
+                await self._command(ws, message, state)
+        finally:
+            pusher.cancel()
+            self._clients.remove(ws)
+
+    async def _push_info(self, ws, state: dict) -> None:
+        """Periodically send the debug info fields that changed."""
+        while not ws.closed:
+            self._send_changes(ws, state)
+            await asyncio.sleep(self._interval)
+
+    def _send_changes(self, ws, state: dict) -> None:
+        """Send debug info fields that differ from the last ones sent."""
+        info = self._wm.get_debug_info()
+        for key in DASHBOARD_HIDDEN:
+            info.pop(key, None)
+        last = state["last"]
+        changes = {}
+        for key, value in info.items():
+            if key not in last or last[key] != value:
+                changes[key] = value
+        if changes:
+            ws.send(json.dumps({"type": "info", "changes": changes}))
+            state["last"] = info
+
+    async def _command(self, ws, message, state: dict) -> None:
+        """
+        Execute a client command and acknowledge it.
+
+        Args:
+            ws: Client socket.
+            message: Received message (JSON text).
+            state: Client's last sent debug info.
+        """
+        try:
+            cmd = json.loads(message).get("cmd")
+        except (ValueError, AttributeError):
+            cmd = None
+
+        ok = True
+        if cmd == "reconnect":
+            ok = bool(ConfigManager.get_networks())
+        elif cmd == "info":
+            state["last"] = {}
+            self._send_changes(ws, state)
+        else:
+            ok = False
+        self._log.info(f"Command {cmd}: {'ok' if ok else 'rejected'}")
+        ws.send(json.dumps({"type": "ack", "cmd": cmd, "ok": ok}))
+        if cmd == "reconnect" and ok:
+            # Leaving AP mode stops the web server and the AP itself
+            await ws.close(WS_CLOSE_GOING_AWAY)
+            self._wm.connect_known()
@@ -272,8 +272,11 @@ class DebugDisplay:
             self._draw_label_value(y, "Version:", str(version))
             y += LINE_H
 
-            wifi = raw_data.get("wifi", {})
+            networks = raw_data.get("networks") or [raw_data.get("wifi", {})]
+            wifi = networks[0] if networks else {}
             saved_ssid = wifi.get("ssid", "N/A")
+            if len(networks) > 1:
+                saved_ssid += f" +{len(networks) - 1}"
             self._draw_label_value(y, "SSID:", saved_ssid)
             y += LINE_H
 
@@ -1,9 +1,13 @@
 """
 Minimal asynchronous DNS server for Captive Portal functionality.
-Intercepts all DNS queries and redirects them to a specific IP address.
+Intercepts all DNS queries and redirects them to a specific IP address,
+or relays them to an upstream resolver while the station uplink is up.
 """
+import random
+import time
 import uasyncio as asyncio
 import usocket as socket
+from collections import OrderedDict
 from logger import Logger
 
 # DNS Protocol Constants
@@ -14,26 +18,394 @@ DNS_DEFAULT_TTL = b'\x00\x00\x00\x3c'  # TTL 60 seconds
 DNS_ANSWER_PTR = b'\xc0\x0c'      # Compression pointer to offset 12
 DNS_IPV4_LEN = b'\x00\x04'        # IPv4 address length
 DNS_MIN_PACKET_LEN = 12           # Minimum valid DNS packet length
+DNS_HEADER_LEN = 12               # Fixed DNS header size
+DNS_QTYPE_A = 1                   # QTYPE of an IPv4 address query
+DNS_TYPE_OPT = 41                 # EDNS pseudo-record (TTL field is flags)
+DNS_QCLASS_IN = 1                 # QCLASS Internet
+DNS_MAX_NAME_LEN = 255            # Maximum encoded QNAME length
+DNS_RECV_BUFSIZE = 1024           # Maximum datagram size accepted
+DNS_RESPONSE_BUFSIZE = 512        # Classic UDP DNS message limit
+DNS_MAX_BATCH = 16                # Max datagrams answered per wakeup
+DNS_CACHE_BYTES = 2048            # Default response cache budget
+DNS_CACHE_ENTRY_OVERHEAD = 32     # Approximate per-entry bookkeeping bytes
+
+# Relay mode
+DNS_RELAY_CACHE_BYTES = 4096      # Default upstream answer cache budget
+DNS_RELAY_MAX_PENDING = 16        # Max queries awaiting an upstream reply
+DNS_RELAY_TIMEOUT_MS = 3000       # Forget unanswered upstream queries after
+DNS_RELAY_MAX_TTL = 3600          # Cap on cached answer lifetime (seconds)
+DNS_RELAY_NEGATIVE_TTL = 30       # Lifetime of empty answers without SOA
+
+# Reachability probe: recursive query for the root NS records (header
+# after the ID: RD flag, one question; then the root name, NS, IN)
+DNS_PROBE_QUERY = b'\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x02\x00\x01'
+DNS_PROBE_TIMEOUT = 0.5           # Seconds to wait for the probe reply
+
+
+def _wait_readable(sock):
+    """
+    Suspend the calling task until the socket has data to read.
+
+    Uses the uasyncio IO queue (the mechanism behind Stream.read), so the
+    task sleeps inside the scheduler's poll() instead of waking on a timer.
+
+    Args:
+        sock: Non-blocking socket to wait on.
+    """
+    yield asyncio.core._io_queue.queue_read(sock)
+
+
+async def probe(server: str, port: int = 53, timeout: float = DNS_PROBE_TIMEOUT) -> bool:
+    """
+    Check that a DNS server answers, e.g. to verify a reused IP lease.
+
+    Any reply with the query's transaction ID counts, whatever its
+    rcode: it proves the address and route work in both directions.
+
+    Args:
+        server: Resolver IP address.
+        port: Resolver port (default 53).
+        timeout: Seconds to wait for the reply.
+
+    Returns:
+        bool: True if the server replied in time.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    try:
+        qid = random.getrandbits(16)
+        sock.sendto(bytes((qid >> 8, qid & 0xFF)) + DNS_PROBE_QUERY, (server, port))
+        await asyncio.wait_for(_wait_readable(sock), timeout)
+        reply = sock.recv(DNS_RECV_BUFSIZE)
+        return len(reply) >= 2 and reply[0] == qid >> 8 and reply[1] == qid & 0xFF
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        sock.close()
+
+
+def parse_question(packet) -> tuple:
+    """
+    Parse the first question of a DNS query.
+
+    Only standard queries (QR=0, OPCODE=0) with at least one question are
+    accepted. The QNAME is walked label by label and must not use
+    compression pointers or exceed DNS_MAX_NAME_LEN.
+
+    Args:
+        packet: The raw DNS request packet.
+
+    Returns:
+        tuple: (qend, qtype, qclass) where qend is the offset just past the
+               first question, or None if the packet is not a valid query.
+    """
+    size = len(packet)
+    if size < DNS_MIN_PACKET_LEN:
+        return None
+    if packet[2] & 0xF8:
+        return None  # Response packet or non-standard opcode
+    if not (packet[4] or packet[5]):
+        return None  # No question
+
+    pos = DNS_HEADER_LEN
+    while True:
+        if pos >= size:
+            return None
+        label = packet[pos]
+        if label == 0:
+            break
+        if label & 0xC0:
+            return None  # Compression pointer or reserved label type
+        pos += label + 1
+        if pos - DNS_HEADER_LEN > DNS_MAX_NAME_LEN:
+            return None
+
+    qend = pos + 5  # Root label + QTYPE + QCLASS
+    if qend > size:
+        return None
+    qtype = (packet[pos + 1] << 8) | packet[pos + 2]
+    qclass = (packet[pos + 3] << 8) | packet[pos + 4]
+    return (qend, qtype, qclass)
+
+
+def _skip_name(packet, pos: int) -> int:
+    """
+    Skip an encoded domain name, following the DNS compression rules.
+
+    Args:
+        packet: DNS message.
+        pos: Offset of the first label.
+
+    Returns:
+        Offset just past the name, or -1 if it runs past the packet.
+    """
+    size = len(packet)
+    while pos < size:
+        label = packet[pos]
+        if label == 0:
+            return pos + 1
+        if label & 0xC0 == 0xC0:
+            return pos + 2 if pos + 2 <= size else -1
+        pos += label + 1
+    return -1
+
+
+def parse_ttls(packet) -> tuple:
+    """
+    Locate the TTL fields of every resource record in a DNS response.
+
+    EDNS OPT records are skipped since their TTL field carries flags.
+
+    Args:
+        packet: The raw DNS response packet.
+
+    Returns:
+        tuple: (min_ttl, offsets) where min_ttl is None if the message has
+               no records, or None if the packet is malformed.
+    """
+    size = len(packet)
+    if size < DNS_HEADER_LEN:
+        return None
+    qdcount = (packet[4] << 8) | packet[5]
+    rrcount = 0
+    for i in (6, 8, 10):
+        rrcount += (packet[i] << 8) | packet[i + 1]
+
+    pos = DNS_HEADER_LEN
+    for _ in range(qdcount):
+        pos = _skip_name(packet, pos)
+        if pos < 0:
+            return None
+        pos += 4
+
+    min_ttl = None
+    offsets = []
+    for _ in range(rrcount):
+        pos = _skip_name(packet, pos)
+        if pos < 0 or pos + 10 > size:
+            return None
+        rtype = (packet[pos] << 8) | packet[pos + 1]
+        if rtype != DNS_TYPE_OPT:
+            ttl = ((packet[pos + 4] << 24) | (packet[pos + 5] << 16) |
+                   (packet[pos + 6] << 8) | packet[pos + 7])
+            offsets.append(pos + 4)
+            if min_ttl is None or ttl < min_ttl:
+                min_ttl = ttl
+        pos += 10 + ((packet[pos + 8] << 8) | packet[pos + 9])
+        if pos > size:
+            return None
+    return (min_ttl, offsets)
+
+
+class PacketCache:
+    """
+    LRU cache of encoded DNS packets bounded by a byte budget.
+
+    Sizes are estimated as key + value + DNS_CACHE_ENTRY_OVERHEAD; the
+    least recently used entries are evicted once the budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = DNS_CACHE_BYTES):
+        """
+        Create an empty cache.
+
+        Args:
+            max_bytes: Byte budget for all entries.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes):
+        """
+        Look up a packet and mark it most recently used.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            The cached packet, or None on a miss.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries[key] = entry
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: bytes, value, length: int = None) -> None:
+        """
+        Store a packet, evicting least recently used entries as needed.
+
+        Args:
+            key: Cache key.
+            value: Packet to store (kept by reference).
+            length: Byte size to account for value (default len(value)).
+        """
+        if length is None:
+            length = len(value)
+        cost = len(key) + length + DNS_CACHE_ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        while self._entries and self.size + cost > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self.size -= self._entries.pop(oldest)[1]
+        self._entries[key] = (value, cost)
+        self.size += cost
+
+    def expire(self, key: bytes) -> None:
+        """
+        Drop an entry the caller found stale; its lookup counts as a miss.
+
+        Args:
+            key: Cache key returned by a preceding get().
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+            self.hits -= 1
+            self.misses += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        self._entries = OrderedDict()
+        self.size = 0
 
 
 class DNSServer:
     """
     A minimal asynchronous DNS server for Captive Portal functionality.
     It intercepts all DNS queries and redirects them to a specific IP address.
+
+    When an upstream resolver is set (see set_upstream()), queries are
+    relayed instead and answers are cached by name/type for their TTL.
     """
 
-    def __init__(self, ip_address: str):
+    def __init__(self, ip_address: str, batch: bool = True,
+                 cache_bytes: int = DNS_CACHE_BYTES,
+                 relay_cache_bytes: int = DNS_RELAY_CACHE_BYTES,
+                 port: int = 53):
         """
         Initialize the DNS server.
 
         Args:
             ip_address: The local IP address to redirect all queries to.
+            batch: Drain all pending datagrams on each wakeup and build
+                replies in a reused buffer (default True). When False, one
+                datagram is answered per wakeup with a freshly built packet.
+            cache_bytes: Byte budget of the built-response cache keyed by
+                question (default 2048, 0 disables caching).
+            relay_cache_bytes: Byte budget of the relay answer cache
+                (default 4096, 0 disables caching in relay mode).
+            port: UDP port to listen on (default 53).
         """
         self._log = Logger("DNSServer")
-        self.ip_address = ip_address
+        self._cache = PacketCache(cache_bytes) if cache_bytes > 0 else None
+        self._port = port
+
+        # Relay mode state
+        self._upstream = None
+        self._relay_cache = None
+        if relay_cache_bytes > 0:
+            self._relay_cache = PacketCache(relay_cache_bytes)
+        self._relay_sock = None   # Opened only while an upstream is set
+        self._relay_task = None
+        self._udps = None         # Client-facing socket while running
+        self._pending = {}  # upstream ID -> (id_hi, id_lo, addr, key, deadline)
+        self._relay_forwarded = 0
+        self._relay_timeouts = 0
+        self._ip_address = ip_address
         self._ip_bytes = self._validate_ip(ip_address)
         self._running = False
         self._task = None
+        self._batch = batch
+
+        # Preallocated reply buffer: the static header fields are written
+        # once here, per query only the ID, question and answer are patched
+        self._tx_buf = None
+        self._tx_view = None
+        if batch:
+            self._tx_buf = bytearray(DNS_RESPONSE_BUFSIZE)
+            self._tx_view = memoryview(self._tx_buf)
+            self._tx_buf[2:4] = DNS_FLAGS_RESPONSE
+            self._tx_buf[4:6] = b'\x00\x01'  # QDCOUNT = 1
+        self._answer = self._build_answer()
+
+    @property
+    def ip_address(self) -> str:
+        """The IP address all names resolve to."""
+        return self._ip_address
+
+    @ip_address.setter
+    def ip_address(self, ip_str: str) -> None:
+        """Change the redirect IP, invalidating cached responses."""
+        if ip_str == self._ip_address:
+            return
+        self._ip_address = ip_str
+        self._ip_bytes = self._validate_ip(ip_str)
+        self._answer = self._build_answer()
+        if self._cache is not None:
+            self._cache.clear()
+
+    def set_upstream(self, ip: str = None, port: int = 53) -> None:
+        """
+        Enable relay mode via an upstream resolver, or disable it.
+
+        Typically called with wlan.ifconfig()[3] while the station link is
+        up (AP+STA), and with None once it drops so clients get the captive
+        redirect. The upstream socket and its receive task only exist while
+        an upstream is set.
+
+        Args:
+            ip: Upstream resolver IP, or None to hijack all names again.
+            port: Upstream resolver port (default 53).
+        """
+        upstream = (ip, port) if ip and ip != "0.0.0.0" else None
+        if upstream == self._upstream:
+            return
+        self._upstream = upstream
+        self._pending = {}
+        if upstream:
+            self._open_relay()
+            self._log.info(f"Relaying to {ip}:{port}")
+        else:
+            self._close_relay()
+            self._log.info(f"Captive redirect to {self._ip_address}")
+
+    def is_relaying(self) -> bool:
+        """Check if queries are relayed to an upstream resolver."""
+        return self._upstream is not None
+
+    def get_stats(self) -> dict:
+        """
+        Get response and relay cache statistics.
+
+        Returns:
+            dict: cache_hits, cache_misses, cache_entries, cache_bytes and
+                  the same relay_* counters plus relay_forwarded,
+                  relay_pending and relay_timeouts.
+        """
+        stats = {
+            "relay_forwarded": self._relay_forwarded,
+            "relay_pending": len(self._pending),
+            "relay_timeouts": self._relay_timeouts,
+        }
+        for prefix, cache in (("cache_", self._cache),
+                              ("relay_", self._relay_cache)):
+            stats[prefix + "hits"] = cache.hits if cache is not None else 0
+            stats[prefix + "misses"] = cache.misses if cache is not None else 0
+            stats[prefix + "entries"] = len(cache) if cache is not None else 0
+            stats[prefix + "bytes"] = cache.size if cache is not None else 0
+        return stats
 
     def _validate_ip(self, ip_str: str) -> bytes:
         """
@@ -56,6 +428,18 @@ class DNSServer:
             pass
         return None
 
+    def _build_answer(self) -> bytes:
+        """
+        Build the answer record shared by every reply.
+
+        Returns:
+            A record pointing at the question name, or None if no valid IP.
+        """
+        if not self._ip_bytes:
+            return None
+        return (DNS_ANSWER_PTR + DNS_TYPE_A + DNS_CLASS_IN +
+                DNS_DEFAULT_TTL + DNS_IPV4_LEN + self._ip_bytes)
+
     def start(self) -> None:
         """Starts the DNS server background task."""
         if not self._running:
@@ -64,6 +448,7 @@ class DNSServer:
             if not self._ip_bytes:
                 self._log.error(f"Invalid IP: {self.ip_address}")
                 return
+            self._answer = self._build_answer()
             self._running = True
             self._task = asyncio.create_task(self._run())
             self._log.info(f"Started (redirect to {self.ip_address})")
@@ -82,27 +467,28 @@ class DNSServer:
         udps.setblocking(False)
 
         try:
-            udps.bind(('0.0.0.0', 53))
+            udps.bind(('0.0.0.0', self._port))
         except Exception as e:
-            self._log.error(f"Failed to bind port 53: {e}")
+            self._log.error(f"Failed to bind port {self._port}: {e}")
             udps.close()
             return
 
+        self._udps = udps
+        if self._upstream is not None:
+            self._open_relay()
+
+        max_batch = DNS_MAX_BATCH if self._batch else 1
         try:
             while self._running:
                 try:
-                    data, addr = None, None
-                    try:
-                        data, addr = udps.recvfrom(1024)
-                    except OSError:
-                        pass  # No data available at this tick
-
-                    if data and addr:
-                        response = self._make_response(data)
-                        if response:
-                            udps.sendto(response, addr)
-
-                    await asyncio.sleep_ms(100)
+                    # Sleep until a datagram arrives, then answer immediately
+                    await _wait_readable(udps)
+                    for _ in range(max_batch):
+                        try:
+                            data, addr = udps.recvfrom(DNS_RECV_BUFSIZE)
+                        except OSError:
+                            break  # Queue drained (or spurious wakeup)
+                        self._reply(udps, data, addr)
 
                 except asyncio.CancelledError:
                     break
@@ -110,38 +496,265 @@ class DNSServer:
                     self._log.error(f"Request error: {e}")
                     await asyncio.sleep(1)
         finally:
+            self._close_relay()
+            self._udps = None
             udps.close()
 
-    def _make_response(self, request: bytes) -> bytes:
+    def _open_relay(self) -> None:
+        """Open the upstream socket and its receive task while running."""
+        if self._relay_sock is not None or self._udps is None:
+            return
+        # Ephemeral port for the forwarded queries
+        relay = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        relay.setblocking(False)
+        relay.bind(('0.0.0.0', 0))
+        self._relay_sock = relay
+        self._relay_task = asyncio.create_task(self._run_relay(relay, self._udps))
+
+    def _close_relay(self) -> None:
+        """Stop the relay receive task and close the upstream socket."""
+        if self._relay_sock is None:
+            return
+        self._relay_task.cancel()
+        self._relay_sock.close()
+        self._relay_sock = None
+        self._relay_task = None
+
+    async def _run_relay(self, relay, udps) -> None:
         """
-        Constructs a minimal DNS response (A record) pointing to the local IP.
+        Receive upstream answers and pass them back to the waiting clients.
+
+        Args:
+            relay: Socket the queries were forwarded on.
+            udps: Client-facing socket to reply on.
+        """
+        while self._running:
+            try:
+                await _wait_readable(relay)
+                for _ in range(DNS_MAX_BATCH):
+                    try:
+                        data, addr = relay.recvfrom(DNS_RECV_BUFSIZE)
+                    except OSError:
+                        break
+                    self._relay_response(udps, data, addr)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self._log.error(f"Relay error: {e}")
+                await asyncio.sleep(1)
+
+    def _reply(self, udps, data: bytes, addr) -> None:
+        """
+        Answer a single query on the given socket.
+
+        Repeat questions are served from the response cache with only the
+        transaction ID patched; misses are built and then cached.
+
+        Args:
+            udps: Bound UDP socket to send the reply on.
+            data: The raw DNS request packet.
+            addr: Client address to reply to.
+        """
+        question = parse_question(data)
+        if not question:
+            return
+        if self._upstream is not None:
+            self._forward(udps, data, question, addr)
+            return
+
+        cache = self._cache
+        key = None
+        response = None
+        if cache is not None:
+            key = data[DNS_HEADER_LEN:question[0]]
+            response = cache.get(key)
+        if response is not None:
+            response[0] = data[0]
+            response[1] = data[1]
+        else:
+            if self._batch:
+                length = self._write_response(data, question)
+                response = self._tx_view[:length] if length else None
+            else:
+                response = self._make_response(data, question)
+            if not response:
+                return
+            if cache is not None:
+                cache.put(key, bytearray(response))
+        udps.sendto(response, addr)
+
+    def _forward(self, udps, data: bytes, question: tuple, addr) -> None:
+        """
+        Answer a query from the relay cache or forward it upstream.
+
+        Cached answers get the client's transaction ID and question (to
+        preserve its name case) patched in, and every TTL rewritten to the
+        remaining lifetime.
+
+        Args:
+            udps: Client-facing socket.
+            data: The raw DNS request packet.
+            question: Result of parse_question(data).
+            addr: Client address to reply to.
+        """
+        qend = question[0]
+        # Names compare case-insensitively; QTYPE/QCLASS bytes are kept as-is
+        key = data[DNS_HEADER_LEN:qend - 4].lower() + data[qend - 4:qend]
+        now = time.ticks_ms()
+
+        cache = self._relay_cache
+        entry = cache.get(key) if cache is not None else None
+        if entry is not None:
+            remaining = time.ticks_diff(entry[2], now) // 1000
+            if remaining > 0:
+                packet = entry[0]
+                packet[0] = data[0]
+                packet[1] = data[1]
+                packet[DNS_HEADER_LEN:qend] = data[DNS_HEADER_LEN:qend]
+                for off in entry[1]:
+                    packet[off] = (remaining >> 24) & 0xFF
+                    packet[off + 1] = (remaining >> 16) & 0xFF
+                    packet[off + 2] = (remaining >> 8) & 0xFF
+                    packet[off + 3] = remaining & 0xFF
+                udps.sendto(packet, addr)
+                return
+            cache.expire(key)
+
+        self._prune_pending(now)
+        if len(self._pending) >= DNS_RELAY_MAX_PENDING:
+            return  # Upstream is backed up; the client will retry
+
+        uid = random.getrandbits(16)
+        while uid in self._pending:
+            uid = random.getrandbits(16)
+        self._pending[uid] = (data[0], data[1], addr, key,
+                              time.ticks_add(now, DNS_RELAY_TIMEOUT_MS))
+        query = bytearray(data)
+        query[0] = uid >> 8
+        query[1] = uid & 0xFF
+        self._relay_sock.sendto(query, self._upstream)
+        self._relay_forwarded += 1
+
+    def _prune_pending(self, now: int) -> None:
+        """Forget forwarded queries whose upstream answer never came."""
+        expired = [uid for uid, p in self._pending.items()
+                   if time.ticks_diff(p[4], now) <= 0]
+        for uid in expired:
+            del self._pending[uid]
+        self._relay_timeouts += len(expired)
+
+    def _relay_response(self, udps, data: bytes, addr) -> None:
+        """
+        Return an upstream answer to its client and cache it for its TTL.
+
+        Args:
+            udps: Client-facing socket.
+            data: The raw DNS response from upstream.
+            addr: Sender address (must be the upstream resolver).
+        """
+        upstream = self._upstream
+        if upstream is None or len(data) < DNS_HEADER_LEN:
+            return
+        if addr[0] != upstream[0] or addr[1] != upstream[1]:
+            return  # Not from our resolver
+        pending = self._pending.pop((data[0] << 8) | data[1], None)
+        if pending is None:
+            return  # Late or unsolicited answer
+
+        packet = bytearray(data)
+        packet[0] = pending[0]
+        packet[1] = pending[1]
+        udps.sendto(packet, pending[2])
+
+        # Cache complete NOERROR/NXDOMAIN answers only
+        cache = self._relay_cache
+        if cache is None or data[2] & 0x02 or (data[3] & 0x0F) not in (0, 3):
+            return
+        ttls = parse_ttls(packet)
+        if not ttls:
+            return
+        ttl = ttls[0] if ttls[0] is not None else DNS_RELAY_NEGATIVE_TTL
+        ttl = min(ttl, DNS_RELAY_MAX_TTL)
+        if ttl > 0:
+            expires = time.ticks_add(time.ticks_ms(), ttl * 1000)
+            cache.put(pending[3], (packet, ttls[1], expires),
+                      len(packet) + 4 * len(ttls[1]))
+
+    def _write_response(self, request: bytes, question: tuple = None) -> int:
+        """
+        Write the DNS response for request into the reply buffer.
+
+        Only the transaction ID, answer count, question and answer are
+        written; the flags and remaining counts were set at construction.
 
         Args:
             request: The raw DNS request packet.
+            question: Result of parse_question(request), if already known.
 
         Returns:
-            The constructed DNS response packet, or None if invalid.
+            Number of bytes of the reply buffer to send, or 0 if invalid.
         """
-        # Validate minimum packet length
-        if len(request) < DNS_MIN_PACKET_LEN:
-            return None
+        if question is None:
+            question = parse_question(request)
+        if not question or not self._answer:
+            return 0
+        qend, qtype, qclass = question
+        has_answer = qtype == DNS_QTYPE_A and qclass == DNS_QCLASS_IN
 
-        # Validate IP bytes are available
-        if not self._ip_bytes:
+        buf = self._tx_view
+        end = qend + len(self._answer) if has_answer else qend
+        if end > DNS_RESPONSE_BUFSIZE:
+            return 0
+
+        # Byte-wise copies of the ID avoid allocating a slice; the question
+        # is copied from one bytes slice (wrapping the request in a
+        # memoryview would cost two view objects instead)
+        buf[0] = request[0]
+        buf[1] = request[1]
+        buf[7] = 1 if has_answer else 0          # ANCOUNT
+        buf[DNS_HEADER_LEN:qend] = request[DNS_HEADER_LEN:qend]
+        if has_answer:
+            buf[qend:end] = self._answer
+        return end
+
+    def _make_response(self, request: bytes, question: tuple = None) -> bytes:
+        """
+        Construct the DNS response for request as a new packet.
+
+        Only the first question is echoed and any additional records (such
+        as EDNS OPT) are dropped. A/IN queries are answered with the local
+        IP; every other type gets an empty NOERROR (NODATA) answer, so
+        clients don't retry AAAA or HTTPS lookups.
+
+        Args:
+            request: The raw DNS request packet.
+            question: Result of parse_question(request), if already known.
+
+        Returns:
+            The constructed DNS response packet, or None if invalid.
+        """
+        if question is None:
+            question = parse_question(request)
+        if not question or not self._ip_bytes:
             return None
 
         try:
-            # DNS Header
-            tid = request[0:2]       # Transaction ID
-            qdcount = request[4:6]   # Questions count (usually 1)
-            ancount = b'\x00\x01'    # Answer count (1)
+            qend, qtype, qclass = question
+            has_answer = qtype == DNS_QTYPE_A and qclass == DNS_QCLASS_IN
+
+            # DNS Header: one question, one or zero answers, no other records
+            tid = request[0:2]
+            qdcount = b'\x00\x01'
+            ancount = b'\x00\x01' if has_answer else b'\x00\x00'
             nscount = b'\x00\x00'
             arcount = b'\x00\x00'
 
             packet = tid + DNS_FLAGS_RESPONSE + qdcount + ancount + nscount + arcount
 
-            # Copy the question section from the original request
-            payload = request[12:]
+            # Copy only the first question from the original request
+            payload = request[DNS_HEADER_LEN:qend]
+            if not has_answer:
+                return packet + payload
 
             # Answer Section using Compression Pointer
             answer = (DNS_ANSWER_PTR + DNS_TYPE_A + DNS_CLASS_IN +
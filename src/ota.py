@@ -0,0 +1,232 @@
+"""
+Streaming over-the-air file updates for WebServer.
+Uploads are written to flash in fixed-size chunks, verified with SHA-256
+and swapped in only when the digest matches.
+"""
+import binascii
+import hashlib
+import os
+import time
+import uasyncio as asyncio
+import machine
+from logger import Logger
+from web_server import PreparedResponse, Request, Response
+
+OTA_PATH = "/ota"
+OTA_CHUNK_SIZE = 1024           # Bytes per socket read / flash write
+OTA_LOG_INTERVAL = 32 * 1024    # Bytes between progress log lines
+OTA_FREE_MARGIN = 16 * 1024     # Flash left free after an upload
+OTA_TMP_SUFFIX = ".ota"
+
+# Characters allowed in target file names (plus '/' between segments)
+OTA_NAME_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-."
+
+
+def _valid_target(name: str) -> bool:
+    """Check that a target path stays inside the filesystem root."""
+    if not name or name.startswith("/") or name.endswith("/"):
+        return False
+    for segment in name.split("/"):
+        if not segment or segment in (".", ".."):
+            return False
+        for char in segment:
+            if char not in OTA_NAME_CHARS:
+                return False
+    return True
+
+
+def _tokens_equal(given: str, expected: str) -> bool:
+    """
+    Compare two tokens in time independent of where they differ.
+
+    Args:
+        given: Token sent by the client (may be None).
+        expected: Configured token.
+
+    Returns:
+        bool: True if both are equal.
+    """
+    a = (given or "").encode()
+    b = expected.encode()
+    diff = len(a) ^ len(b)
+    for i in range(len(b)):
+        diff |= (a[i] if i < len(a) else 0) ^ b[i]
+    return diff == 0
+
+
+def _free_bytes() -> int:
+    """Free space on the root filesystem, or None if unknown."""
+    try:
+        stat = os.statvfs("/")
+        return stat[0] * stat[4]
+    except (AttributeError, OSError):
+        return None
+
+
+class OTAUpdater:
+    """
+    Accepts file uploads on a streaming WebServer route.
+
+    Protocol:
+        POST /ota?file=<path>[&reboot=1]
+        X-SHA256: <hex digest of the file>   (or ?sha256=<hex>)
+        X-OTA-Token: <token>
+        Content-Length: <size>
+
+        <raw file bytes>
+
+    The body is read through one OTA_CHUNK_SIZE buffer into
+    <path>.ota while a SHA-256 is updated, so RAM use does not depend on
+    the file size. On a digest match the temporary file replaces the
+    target with os.rename(); otherwise it is deleted and the target is
+    left untouched. With reboot=1 the device resets after answering.
+
+    A token is mandatory: the route can replace main.py, and the
+    provisioning AP is open to anyone who knows its (default) password.
+
+    Example:
+        curl -X POST -H "X-SHA256: $(sha256sum app.py | cut -d' ' -f1)" \\
+             --data-binary @app.py "http://192.168.4.1/ota?file=app.py"
+    """
+
+    def __init__(self, web_server, path: str = OTA_PATH, token: str = None,
+                 max_size: int = None):
+        """
+        Register the upload route.
+
+        Args:
+            web_server: WebServer instance to register the route on.
+            path: URL path of the upload route (default '/ota').
+            token: Shared secret required in X-OTA-Token (mandatory).
+            max_size: Optional upload size limit in bytes (free flash
+                minus OTA_FREE_MARGIN is always enforced).
+
+        Raises:
+            ValueError: If no token is given.
+        """
+        if not token:
+            raise ValueError("OTAUpdater requires a token")
+        self._log = Logger("OTA")
+        self._token = token
+        self._max_size = max_size
+        self._reboot_task = None
+        self._forbidden = PreparedResponse("Invalid or missing token", 403)
+        self._bad_target = PreparedResponse("Invalid target file", 400)
+        self._no_digest = PreparedResponse("SHA-256 digest required", 400)
+        self._no_length = PreparedResponse("Content-Length required", 411)
+        self._too_large = PreparedResponse("Not enough flash space", 507)
+        self._mismatch = PreparedResponse("Digest mismatch", 400)
+        web_server.add_route(path, self._handle_upload, method="POST", stream=True)
+
+    async def _handle_upload(self, request: Request) -> Response:
+        """Receive, verify and install one file."""
+        if not _tokens_equal(request.header("x-ota-token"), self._token):
+            return self._forbidden
+        target = request.query.get("file", "")
+        if not _valid_target(target):
+            return self._bad_target
+        expected = request.header("x-sha256") or request.query.get("sha256")
+        if not expected:
+            return self._no_digest
+        size = request.content_length
+        if not size:
+            return self._no_length
+        free = _free_bytes()
+        if ((self._max_size is not None and size > self._max_size)
+                or (free is not None and size > free - OTA_FREE_MARGIN)):
+            self._log.warning(f"Upload of {size} bytes rejected (free: {free})")
+            return self._too_large
+
+        tmp = target + OTA_TMP_SUFFIX
+        self._log.info(f"Receiving {target} ({size} bytes)")
+        try:
+            digest = await self._receive(request.stream, tmp, size)
+        except (OSError, EOFError, asyncio.TimeoutError) as e:
+            self._log.error(f"Upload of {target} failed: {e!r}")
+            self._remove(tmp)
+            return Response("Upload failed", 500, "text/plain")
+
+        if digest != expected.strip().lower():
+            self._log.warning(f"Digest mismatch for {target}: got {digest}")
+            self._remove(tmp)
+            return self._mismatch
+
+        try:
+            self._replace(tmp, target)
+        except OSError as e:
+            self._log.error(f"Install of {target} failed: {e}")
+            self._remove(tmp)
+            return Response("Install failed", 500, "text/plain")
+        self._log.info(f"Installed {target}")
+
+        if request.query.get("reboot") == "1":
+            self._reboot_task = asyncio.create_task(self._reboot())
+        return Response(
+            f'{{"file": "{target}", "size": {size}, "sha256": "{digest}"}}',
+            200, "application/json"
+        )
+
+    async def _receive(self, stream, tmp: str, size: int) -> str:
+        """
+        Copy the body to a temporary file while hashing it.
+
+        Args:
+            stream: The request's BodyReader.
+            tmp: Temporary file path.
+            size: Expected body size.
+
+        Returns:
+            Hex SHA-256 of the received bytes.
+        """
+        buf = bytearray(OTA_CHUNK_SIZE)
+        view = memoryview(buf)
+        sha = hashlib.sha256()
+        received = 0
+        next_log = OTA_LOG_INTERVAL
+        start = time.ticks_ms()
+        with open(tmp, "wb") as f:
+            while True:
+                n = await stream.readinto(buf)
+                if not n:
+                    break
+                chunk = view[:n]
+                sha.update(chunk)
+                f.write(chunk)
+                received += n
+                if received >= next_log:
+                    next_log += OTA_LOG_INTERVAL
+                    self._log_progress(received, size, start)
+        self._log_progress(received, size, start)
+        return binascii.hexlify(sha.digest()).decode()
+
+    def _log_progress(self, received: int, size: int, start: int) -> None:
+        """Log bytes received and average throughput."""
+        elapsed = max(time.ticks_diff(time.ticks_ms(), start), 1)
+        self._log.info(
+            f"{received}/{size} bytes ({received * 100 // size}%), "
+            f"{received * 1000 // elapsed // 1024} KB/s"
+        )
+
+    @staticmethod
+    def _replace(tmp: str, target: str) -> None:
+        """Move the verified file over the target."""
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Filesystems that refuse to rename over an existing file (FAT)
+            os.remove(target)
+            os.rename(tmp, target)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Delete a file if it exists."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def _reboot(self) -> None:
+        """Delayed reboot to allow the HTTP response to be sent."""
+        self._log.info("Rebooting in 1 second...")
+        await asyncio.sleep(1)
+        machine.reset()
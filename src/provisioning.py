@@ -2,11 +2,210 @@
 Provisioning handler for WiFi configuration via web interface.
 Handles HTTP routes, template rendering, and form processing.
 """
+import binascii
 import json
+import os
 import uasyncio as asyncio
 import machine
+from collections import OrderedDict
+from config import WiFiConfig
 from config_manager import ConfigManager
 from logger import Logger
+from scan_service import ScanService
+from web_server import PreparedResponse, Request, Response, static_response
+
+# Directories searched for templates, in order
+TEMPLATE_DIRS = ("templates", "src/templates")
+
+# RAM budget for compiled templates; least recently used are evicted
+TEMPLATE_CACHE_BYTES = 8192
+TEMPLATE_ENTRY_OVERHEAD = 32  # Estimated per-entry bookkeeping bytes
+
+# Characters allowed in template names
+TEMPLATE_NAME_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+
+# OS connectivity-check URLs answered with the probe redirect
+CAPTIVE_PROBE_PATHS = (
+    "/hotspot-detect.html",           # Apple
+    "/library/test/success.html",     # Apple (older iOS/macOS)
+    "/generate_204",                  # Android / ChromeOS
+    "/gen_204",                       # Android
+    "/connecttest.txt",               # Windows 10+
+    "/ncsi.txt",                      # Windows (legacy)
+    "/redirect",                      # Windows
+    "/success.txt",                   # Firefox
+    "/canonical.html",                # Firefox
+)
+
+
+def build_probe_response(portal_ip: str) -> PreparedResponse:
+    """
+    Encode the redirect sent to OS connectivity probes.
+
+    Any answer other than the expected one (204, "Success", ...) makes
+    the OS show its captive portal sign-in; a 302 to the portal root
+    works on all of them and opens the provisioning page directly.
+
+    Args:
+        portal_ip: Address of the provisioning web server.
+
+    Returns:
+        PreparedResponse with an empty body, so the probing client can
+        keep its connection for the portal page.
+    """
+    return PreparedResponse(b"", 302, None, {
+        "Location": f"http://{portal_ip}/",
+        "Cache-Control": "no-store",
+    })
+
+
+def compile_template(data: bytes) -> tuple:
+    """
+    Split a template into literal and placeholder segments.
+
+    Args:
+        data: Template source; placeholders are written {{name}}.
+
+    Returns:
+        tuple: bytes literals interleaved with str placeholder names.
+    """
+    segments = []
+    pos = 0
+    while True:
+        start = data.find(b"{{", pos)
+        if start < 0:
+            break
+        end = data.find(b"}}", start + 2)
+        if end < 0:
+            break
+        if start > pos:
+            segments.append(data[pos:start])
+        segments.append(data[start + 2:end].decode().strip())
+        pos = end + 2
+    if pos < len(data):
+        segments.append(data[pos:])
+    return tuple(segments)
+
+
+def _escape_html(text: str) -> str:
+    """Escape text for use in HTML content and attribute values."""
+    return (text.replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+class TemplateCache:
+    """
+    Resolves, compiles and caches HTML templates.
+
+    Each template name is resolved against TEMPLATE_DIRS once and the
+    result (including a miss) is remembered. Templates with {{name}}
+    placeholders are compiled into segments and kept in RAM within a byte
+    budget, least recently used first out; templates without placeholders
+    are only marked static so they keep streaming from flash with
+    gzip/ETag support.
+    """
+
+    def __init__(self, max_bytes: int = TEMPLATE_CACHE_BYTES):
+        """
+        Create an empty cache.
+
+        Args:
+            max_bytes: Byte budget for compiled templates.
+        """
+        self._log = Logger("Templates")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._paths = {}
+        self._static = set()
+        self._entries = OrderedDict()
+
+    def path(self, name: str) -> str:
+        """
+        Resolve the path of a template file.
+
+        Args:
+            name: Template name (without .html extension).
+
+        Returns:
+            Path of the first existing candidate, or None.
+        """
+        if name in self._paths:
+            return self._paths[name]
+
+        # Validate template name (alphanumeric and underscore only)
+        for char in name:
+            if char not in TEMPLATE_NAME_CHARS:
+                self._log.warning(f"Invalid template name: {name}")
+                return None
+
+        found = None
+        for directory in TEMPLATE_DIRS:
+            candidate = f"{directory}/{name}.html"
+            try:
+                os.stat(candidate)
+                found = candidate
+                break
+            except OSError:
+                continue
+        if found is None:
+            self._log.warning(f"Template not found: {name}")
+        self._paths[name] = found
+        return found
+
+    def get(self, name: str) -> tuple:
+        """
+        Get the compiled segments of a template with placeholders.
+
+        Args:
+            name: Template name (without .html extension).
+
+        Returns:
+            tuple: Segments (see compile_template()), () if the template
+                   has no placeholders, or None if it cannot be read.
+        """
+        if name in self._static:
+            return ()
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._entries[name] = entry
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        path = self.path(name)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                segments = compile_template(f.read())
+        except OSError as e:
+            self._log.error(f"Template read failed: {e}")
+            return None
+        if not any(isinstance(segment, str) for segment in segments):
+            self._static.add(name)
+            return ()
+        self._put(name, segments)
+        return segments
+
+    def _put(self, name: str, segments: tuple) -> None:
+        """Store compiled segments, evicting least recently used entries."""
+        cost = TEMPLATE_ENTRY_OVERHEAD + sum(len(s) for s in segments)
+        if cost > self.max_bytes:
+            return
+        while self._entries and self.size + cost > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self.size -= self._entries.pop(oldest)[1]
+        self._entries[name] = (segments, cost)
+        self.size += cost
+
+    def clear(self) -> None:
+        """Drop compiled templates and remembered paths."""
+        self._paths = {}
+        self._static = set()
+        self._entries = OrderedDict()
+        self.size = 0
 
 
 class ProvisioningHandler:
@@ -15,60 +214,148 @@ class ProvisioningHandler:
     Manages routes, templates, and configuration form processing.
     """
 
-    def __init__(self, web_server, on_config_saved=None, wlan=None):
+    def __init__(self, web_server, on_config_saved=None, wlan=None,
+                 portal_ip: str = None,
+                 template_cache_bytes: int = TEMPLATE_CACHE_BYTES,
+                 scanner: ScanService = None, ap_ssid: str = None):
         """
         Initialize the provisioning handler.
 
         Args:
             web_server: WebServer instance to register routes on.
             on_config_saved: Optional callback when config is saved successfully.
-            wlan: Optional WLAN STA_IF interface for WiFi scanning.
+            wlan: Optional WLAN STA_IF interface for WiFi scanning
+                (used when no scanner is given).
+            portal_ip: Address captive probes are redirected to
+                (default WiFiConfig.AP_IP).
+            template_cache_bytes: RAM budget for compiled templates.
+            scanner: Optional shared ScanService for /scan.
+            ap_ssid: SSID shown on the provisioning page
+                (default WiFiConfig.AP_SSID).
         """
         self._log = Logger("Provisioning")
         self._web_server = web_server
         self._on_config_saved = on_config_saved
         self._wlan = wlan
+        if scanner is None and wlan is not None:
+            scanner = ScanService(wlan)
+        self._scanner = scanner
         self._reboot_task = None
+        self._templates = TemplateCache(template_cache_bytes)
+        self._portal_ip = None
+        self._probe_response = None
+        self.portal_ip = portal_ip if portal_ip is not None else WiFiConfig.AP_IP
+
+        # Placeholder values of the provisioning page, fixed for the device
+        self._page_values = {
+            "ap_ssid": ap_ssid if ap_ssid is not None else WiFiConfig.AP_SSID,
+            "device_id": binascii.hexlify(machine.unique_id()).decode(),
+        }
+
+        # Fixed answers, encoded once with their reason phrase and length
+        self._invalid_ssid = PreparedResponse(
+            "Invalid SSID (must be 1-32 bytes)", 400
+        )
+        self._password_required = PreparedResponse("Password is required", 400)
+        self._invalid_password = PreparedResponse(
+            "Invalid password (must be 8-63 bytes)", 400
+        )
+        self._save_failed = PreparedResponse("Failed to save configuration", 500)
+        self._scanner_unavailable = PreparedResponse(
+            json.dumps({"error": "Scanner not available"}), 503,
+            "application/json"
+        )
+        self._scan_failed = PreparedResponse(
+            json.dumps({"error": "Scan failed"}), 500, "application/json"
+        )
+        self._success = self._prepare_page("success")
         self._setup_routes()
 
+    @property
+    def portal_ip(self) -> str:
+        """Address captive probes are redirected to."""
+        return self._portal_ip
+
+    @portal_ip.setter
+    def portal_ip(self, value: str) -> None:
+        # Encoded once here, so each probe hit is a single constant write
+        if value != self._portal_ip:
+            self._portal_ip = value
+            self._probe_response = build_probe_response(value)
+
     def _setup_routes(self) -> None:
         """Register routes for the provisioning web server."""
         self._web_server.add_route("/", self._handle_root_request)
-        # Apple captive portal detection
-        self._web_server.add_route("/hotspot-detect.html", self._handle_root_request)
-        # Android captive portal detection
-        self._web_server.add_route("/generate_204", self._handle_root_request)
+        # Apple/Android/Windows/Firefox captive portal detection
+        for path in CAPTIVE_PROBE_PATHS:
+            self._web_server.add_route(path, self._handle_probe)
         self._web_server.add_route("/configure", self._handle_configure, method="POST")
         self._web_server.add_route("/scan", self._handle_scan)
 
-    def _read_template(self, name: str) -> str:
+    def _template_response(self, name: str, request: Request,
+                           values: dict = None) -> Response:
         """
-        Read a template file from templates/ directory.
+        Build a response for a template.
+
+        Templates without placeholders stream from flash in fixed-size
+        chunks, preferring a precompressed templates/<name>.html.gz and
+        revalidating repeat visits with ETag/304. Templates with
+        placeholders are rendered from their cached compiled segments.
 
         Args:
             name: Template name (without .html extension).
+            request: Request (for Accept-Encoding/If-None-Match).
+            values: Placeholder values; missing ones render empty and all
+                are HTML-escaped.
 
         Returns:
-            Template content or error message.
+            Response, or an error page if the template is missing.
         """
-        # Validate template name (alphanumeric and underscore only)
-        allowed = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
-        for char in name:
-            if char not in allowed:
-                self._log.warning(f"Invalid template name: {name}")
-                return "Error: Invalid template name"
+        segments = self._templates.get(name)
+        if segments == ():
+            path = self._templates.path(name)
+            response = static_response(request, path, "text/html")
+            if response.status != 404:
+                return response
+        elif segments is not None:
+            values = values or {}
+            chunks = []
+            length = 0
+            for segment in segments:
+                if isinstance(segment, str):
+                    segment = _escape_html(str(values.get(segment, ""))).encode()
+                chunks.append(segment)
+                length += len(segment)
+            return Response(chunks, headers={"Cache-Control": "no-store"},
+                            length=length)
+        return self._build_html_response(
+            f"Error: Template {name} not found", status=500
+        )
 
-        paths = [f"templates/{name}.html", f"src/templates/{name}.html"]
-        for path in paths:
-            try:
-                with open(path, "r") as f:
-                    return f.read()
-            except OSError:
-                continue
-        self._log.warning(f"Template not found: {name}")
-        return f"Error: Template {name} not found"
+    def _prepare_page(self, name: str) -> PreparedResponse:
+        """
+        Encode a placeholder-free template as a fixed response.
+
+        Args:
+            name: Template name (without .html extension).
+
+        Returns:
+            PreparedResponse, or None if the template cannot be read
+            (it is then served through _template_response()).
+        """
+        path = self._templates.path(name)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except OSError as e:
+            self._log.error(f"Template read failed: {e}")
+            return None
+        return PreparedResponse(body, 200, "text/html",
+                                {"Cache-Control": "no-store"})
 
-    def _build_html_response(self, html: str, status: int = 200) -> bytes:
+    def _build_html_response(self, html: str, status: int = 200) -> Response:
         """
         Build an HTTP response with HTML content.
 
@@ -77,11 +364,11 @@ class ProvisioningHandler:
             status: HTTP status code (default 200).
 
         Returns:
-            Encoded HTTP response.
+            HTML response.
         """
-        return f"HTTP/1.1 {status} OK\r\nContent-Type: text/html\r\n\r\n{html}".encode()
+        return Response(html, status)
 
-    def _build_json_response(self, data, status: int = 200) -> bytes:
+    def _build_json_response(self, data, status: int = 200) -> Response:
         """
         Build an HTTP response with JSON content.
 
@@ -90,81 +377,66 @@ class ProvisioningHandler:
             status: HTTP status code (default 200).
 
         Returns:
-            Encoded HTTP response.
-        """
-        body = json.dumps(data)
-        return (
-            f"HTTP/1.1 {status} OK\r\n"
-            "Content-Type: application/json\r\n"
-            f"\r\n{body}"
-        ).encode()
-
-    async def _handle_scan(self, request: dict) -> bytes:
-        """Scan for nearby WiFi networks and return as JSON."""
-        if not self._wlan:
-            return self._build_json_response(
-                {"error": "Scanner not available"}, status=503
-            )
+            JSON response, serialized while it is sent.
+        """
+        return Response.json(data, status)
+
+    async def _handle_scan(self, request: Request) -> Response:
+        """
+        Return nearby WiFi networks as JSON.
 
+        Cached results are returned immediately (refreshed in the
+        background once stale). '?max_age=<seconds>' asks for results no
+        older than that, waiting for a scan if needed; max_age=0 forces
+        one. The Age header gives the age of the results in seconds.
+        """
+        if not self._scanner:
+            return self._scanner_unavailable
+
+        max_age = request.query.get("max_age")
         try:
-            self._wlan.active(True)
-            results = self._wlan.scan()
-        except Exception as e:
-            self._log.error(f"Scan failed: {e}")
-            return self._build_json_response(
-                {"error": "Scan failed"}, status=500
-            )
+            max_age = int(max_age) * 1000 if max_age else None
+        except ValueError:
+            max_age = None
 
-        # Deduplicate by SSID, keeping strongest signal
-        seen = {}
-        for item in results:
-            ssid = item[0].decode("utf-8", "ignore")
-            rssi = item[3]
-            security = item[4]
-            if not ssid:
-                continue
-            if ssid not in seen or rssi > seen[ssid]["rssi"]:
-                seen[ssid] = {
-                    "ssid": ssid,
-                    "rssi": rssi,
-                    "security": security
-                }
-
-        # Sort by RSSI descending (strongest first)
-        networks = sorted(
-            seen.values(), key=lambda x: x["rssi"], reverse=True
-        )
-        return self._build_json_response(networks)
+        networks = await self._scanner.get(max_age)
+        if networks is None:
+            return self._scan_failed
+        age = self._scanner.age() or 0
+        return Response.json(networks, 200,
+                             {"Age": age // 1000, "Cache-Control": "no-store"})
+
+    async def _handle_probe(self, request: Request) -> PreparedResponse:
+        """Answer an OS connectivity probe with the portal redirect."""
+        return self._probe_response
 
-    async def _handle_root_request(self, request: dict) -> bytes:
+    async def _handle_root_request(self, request: Request) -> Response:
         """Serve the main provisioning page."""
-        html = self._read_template("provision")
-        return self._build_html_response(html)
+        return self._template_response("provision", request, self._page_values)
 
-    async def _handle_configure(self, request: dict) -> bytes:
+    async def _handle_configure(self, request: Request):
         """Process form submission from the provisioning page."""
         self._log.info("Received configure request")
-        params = request.get("params", {})
+        params = request.params
         ssid = params.get("ssid", "").strip()
         password = params.get("password", "").strip()
 
         # Validate SSID (1-32 bytes, required)
-        if not ssid or len(ssid) > 32:
+        if not ssid or len(ssid.encode()) > 32:
             self._log.warning("Invalid SSID submitted")
-            return b"HTTP/1.1 400 Bad Request\r\n\r\nInvalid SSID (must be 1-32 characters)"
+            return self._invalid_ssid
 
-        # Validate Password (8-63 chars for WPA2, required)
+        # Validate Password (8-63 bytes for WPA2, required)
         if not password:
             self._log.warning(
                 "Empty password received "
                 f"(params keys: {list(params.keys())})"
             )
-            return b"HTTP/1.1 400 Bad Request\r\n\r\nPassword is required"
-        if len(password) < 8 or len(password) > 63:
-            self._log.warning(
-                f"Invalid password length: {len(password)}"
-            )
-            return b"HTTP/1.1 400 Bad Request\r\n\r\nInvalid password (must be 8-63 characters)"
+            return self._password_required
+        size = len(password.encode())
+        if size < 8 or size > 63:
+            self._log.warning(f"Invalid password length: {size} bytes")
+            return self._invalid_password
 
         # Save configuration to flash
         success = ConfigManager.save_config(ssid, password)
@@ -176,11 +448,10 @@ class ProvisioningHandler:
 
             # Schedule a reboot to apply changes
             self._reboot_task = asyncio.create_task(self._reboot_device())
-            html = self._read_template("success")
-            return self._build_html_response(html)
+            return self._success or self._template_response("success", request)
         else:
             self._log.error("Failed to save config")
-            return b"HTTP/1.1 500 Internal Server Error\r\n\r\nFailed to save configuration"
+            return self._save_failed
 
     async def _reboot_device(self) -> None:
         """Delayed reboot to allow HTTP response to be sent."""
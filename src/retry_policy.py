@@ -0,0 +1,150 @@
+"""
+Retry policies for WiFiManager reconnects.
+A policy decides how long to wait after a failed connection attempt and
+how long the next attempt may take.
+"""
+import hashlib
+import time
+import machine
+
+# Exponential backoff defaults
+BACKOFF_BASE = 1            # Seconds of the first backoff window
+BACKOFF_CAP = 120           # Longest backoff window in seconds
+BACKOFF_FACTOR = 2          # Window growth per consecutive failure
+TIMEOUT_SCALE = 1.5         # connect_timeout growth per attempt in a cycle
+TIMEOUT_CAP = 60            # Longest connect timeout in seconds
+SEED_DISCARD = 8            # Generator outputs skipped after seeding
+SEED_ADC_READS = 8          # Temperature sensor reads mixed into the seed
+
+
+class FixedDelay:
+    """
+    The original policy: a constant delay and an unchanged timeout.
+    Used when WiFiConfig.retry_policy is None, with retry_delay.
+    """
+
+    def __init__(self, delay: float):
+        """
+        Args:
+            delay: Seconds to wait after every failed attempt.
+        """
+        self._delay = delay
+
+    def delay(self, failures: int) -> float:
+        """
+        Get the wait before the next attempt.
+
+        Args:
+            failures: Consecutive failed attempts so far (1 after the
+                first failure), including those before a reboot.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        return self._delay
+
+    def connect_timeout(self, attempt: int, base: float) -> float:
+        """
+        Get how long an attempt may take to get an IP address.
+
+        Args:
+            attempt: Attempt number within the current cycle (1-based).
+            base: WiFiConfig.connect_timeout.
+
+        Returns:
+            float: Seconds before the attempt is abandoned.
+        """
+        return base
+
+
+class ExponentialBackoff(FixedDelay):
+    """
+    Exponential backoff with full jitter.
+
+    After n consecutive failures the wait is drawn uniformly from
+    [0, min(cap, base * factor ** (n - 1))], so devices that lost the
+    same access point at the same moment spread their reconnects instead
+    of retrying in lockstep. The generator is a private xorshift (the
+    global random module is left alone). Its seed is a SHA-256 of
+    machine.unique_id(), the boot-time microsecond counter and ADC noise,
+    so boards from one batch with near-identical IDs, and repeated boots
+    of one board, get unrelated sequences.
+
+    Attempt timeouts grow by timeout_scale per attempt within a cycle,
+    for access points that are slow to accept clients while they restart.
+    """
+
+    def __init__(self, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP,
+                 factor: float = BACKOFF_FACTOR, jitter: bool = True,
+                 timeout_scale: float = TIMEOUT_SCALE,
+                 timeout_cap: float = TIMEOUT_CAP, seed: int = None):
+        """
+        Args:
+            base: Backoff window after the first failure, in seconds.
+            cap: Longest backoff window, in seconds.
+            factor: Window growth per consecutive failure.
+            jitter: Draw the wait from the window (True) or wait the
+                whole window (False).
+            timeout_scale: connect_timeout multiplier per attempt.
+            timeout_cap: Longest connect timeout, in seconds.
+            seed: Fixed seed for reproducible sequences (still hashed);
+                defaults to one from the chip ID and boot-time entropy.
+        """
+        super().__init__(base)
+        self._cap = cap
+        self._factor = factor
+        self._jitter = jitter
+        self._timeout_scale = timeout_scale
+        self._timeout_cap = timeout_cap
+        self._state = _hash_seed(str(seed).encode() if seed is not None else _entropy())
+        for _ in range(SEED_DISCARD):
+            self._random()
+
+    def delay(self, failures: int) -> float:
+        """Get a jittered wait from the backoff window for failures."""
+        window = self._delay
+        for _ in range(failures - 1):
+            window *= self._factor
+            if window >= self._cap:
+                break
+        window = min(window, self._cap)
+        if self._jitter:
+            return window * self._random()
+        return window
+
+    def connect_timeout(self, attempt: int, base: float) -> float:
+        """Get base scaled by timeout_scale per earlier attempt, capped."""
+        timeout = base
+        for _ in range(attempt - 1):
+            timeout *= self._timeout_scale
+            if timeout >= self._timeout_cap:
+                break
+        return min(timeout, max(base, self._timeout_cap))
+
+    def _random(self) -> float:
+        """Next xorshift32 value scaled to [0, 1)."""
+        x = self._state
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        self._state = x
+        return x / 4294967296
+
+
+def _entropy() -> bytes:
+    """Collect the chip ID, the microsecond counter and ADC noise."""
+    data = bytearray(machine.unique_id())
+    data.extend(str(time.ticks_us()).encode())
+    try:
+        sensor = machine.ADC(4)  # Internal temperature sensor
+        for _ in range(SEED_ADC_READS):
+            data.append(sensor.read_u16() & 0xFF)
+    except (AttributeError, ValueError, OSError):
+        pass
+    return bytes(data)
+
+
+def _hash_seed(data: bytes) -> int:
+    """Hash seed material into a non-zero 32-bit xorshift state."""
+    digest = hashlib.sha256(data).digest()
+    return int.from_bytes(digest[:4], "big") or 1
@@ -0,0 +1,174 @@
+"""
+Cached WiFi scan service.
+Runs station scans outside request handlers and shares the results.
+"""
+import binascii
+import time
+import uasyncio as asyncio
+from logger import Logger
+
+# Results younger than this are served without scanning again
+SCAN_TTL = 30  # Seconds
+
+
+class ScanService:
+    """
+    Shares WiFi scan results between the web interface and WiFiManager.
+
+    Results are deduplicated by SSID (strongest signal kept), sorted by
+    RSSI and cached with a timestamp. Concurrent requests for a fresh
+    scan share one radio scan instead of each starting their own.
+
+    Note that the cyw43 driver's scan() itself still blocks the event
+    loop while the radio sweeps the channels; the service makes that
+    happen once per TTL, ahead of demand where possible, rather than on
+    every request.
+    """
+
+    def __init__(self, wlan, ttl: int = SCAN_TTL, on_results=None):
+        """
+        Initialize the scan service.
+
+        Args:
+            wlan: WLAN STA_IF interface used for scanning.
+            ttl: Seconds results stay fresh (default 30).
+            on_results: Optional callback receiving the networks list
+                after each successful scan.
+        """
+        self._log = Logger("ScanService")
+        self._wlan = wlan
+        self._ttl_ms = ttl * 1000
+        self._on_results = on_results
+        self._networks = None
+        self._timestamp = 0
+        self._task = None
+        self._done = None
+        self.scans = 0
+
+    def age(self) -> int:
+        """
+        Get the age of the cached results.
+
+        Returns:
+            int: Age in milliseconds, or None if nothing was scanned yet.
+        """
+        if self._networks is None:
+            return None
+        return time.ticks_diff(time.ticks_ms(), self._timestamp)
+
+    def is_scanning(self) -> bool:
+        """Check if a scan is in progress."""
+        return self._task is not None
+
+    def cached(self, max_age: int = None) -> list:
+        """
+        Get cached results without scanning.
+
+        Args:
+            max_age: Maximum acceptable age in milliseconds (default TTL).
+
+        Returns:
+            list: Networks as dicts (ssid, rssi, security), strongest
+                  first, or None if there are none fresh enough.
+        """
+        age = self.age()
+        if age is None:
+            return None
+        if age > (self._ttl_ms if max_age is None else max_age):
+            return None
+        return self._networks
+
+    def refresh(self) -> None:
+        """Start a background scan unless one is already running."""
+        if self._task is None:
+            self._done = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def scan(self, max_age: int = None) -> list:
+        """
+        Get results no older than max_age, scanning if needed.
+
+        Args:
+            max_age: Maximum acceptable age in milliseconds (default TTL,
+                0 forces a new scan).
+
+        Returns:
+            list: Networks (see cached()), or None if no scan succeeded
+                  yet. A failed rescan leaves the previous results.
+        """
+        networks = self.cached(max_age)
+        if networks is not None:
+            return networks
+        self.refresh()
+        await self._done.wait()
+        return self._networks
+
+    async def get(self, max_age: int = None) -> list:
+        """
+        Get results for a client, preferring an immediate answer.
+
+        Without max_age, any cached results are returned at once and a
+        background refresh is started when they are older than the TTL;
+        only the very first request waits for a scan.
+
+        Args:
+            max_age: Maximum acceptable age in milliseconds, waiting for
+                a scan if the cache is older.
+
+        Returns:
+            list: Networks (see cached()), or None if no scan succeeded.
+        """
+        if max_age is not None or self._networks is None:
+            return await self.scan(max_age)
+        if self.cached() is None:
+            self.refresh()
+        return self._networks
+
+    async def _run(self) -> None:
+        """Perform one scan and publish its results to all waiters."""
+        try:
+            # Let the current handler finish writing before the radio blocks
+            await asyncio.sleep_ms(0)
+            self._wlan.active(True)
+            results = self._wlan.scan()
+            self._networks = self._dedupe(results)
+            self._timestamp = time.ticks_ms()
+            self.scans += 1
+            self._log.debug(f"Scan found {len(self._networks)} networks")
+            if self._on_results:
+                self._on_results(self._networks)
+        except Exception as e:
+            self._log.error(f"Scan failed: {e}")
+        finally:
+            self._task = None
+            self._done.set()
+
+    @staticmethod
+    def _dedupe(results) -> list:
+        """
+        Deduplicate raw scan tuples by SSID and sort by signal strength.
+
+        Args:
+            results: Tuples from WLAN.scan()
+                (ssid, bssid, channel, rssi, security, hidden).
+
+        Returns:
+            list: Dicts with ssid, rssi, security, and the bssid (hex)
+                  and channel of the strongest access point, strongest
+                  first.
+        """
+        seen = {}
+        for item in results:
+            ssid = item[0].decode("utf-8", "ignore")
+            rssi = item[3]
+            if not ssid:
+                continue
+            if ssid not in seen or rssi > seen[ssid]["rssi"]:
+                seen[ssid] = {
+                    "ssid": ssid,
+                    "rssi": rssi,
+                    "security": item[4],
+                    "bssid": binascii.hexlify(item[1]).decode(),
+                    "channel": item[2]
+                }
+        return sorted(seen.values(), key=lambda x: x["rssi"], reverse=True)
@@ -1,36 +1,1326 @@
 """
 Lightweight asynchronous HTTP server designed for device provisioning.
-Supports basic routing, header parsing, and URL-encoded body parameters.
+Supports exact, prefix and parameterised routes, lazy header parsing,
+URL-encoded body and query parameters, streamed response bodies,
+Server-Sent Events and WebSockets.
 """
+import json
+import os
 import uasyncio as asyncio
 from logger import Logger
+from websocket import WS_MAX_CLIENTS, WebSocket, accept_key
 
 # Security limit for Content-Length to prevent memory exhaustion
+# (routes added with stream=True read their body themselves and are exempt)
 MAX_CONTENT_LENGTH = 1024  # 1KB is sufficient for provisioning forms
 
+# Persistent connection limits
+KEEPALIVE_TIMEOUT = 5         # Seconds to wait for the next request
+KEEPALIVE_MAX_REQUESTS = 10   # Requests served per connection
+
+# Resource limits (slowloris / PCB exhaustion protection)
+MAX_CONNECTIONS = 4           # Concurrent client connections
+MAX_STREAMS = 2               # Of those, held by SSE streams and WebSockets
+REQUEST_LINE_TIMEOUT = 5      # Seconds to receive the first request line
+HEADER_TIMEOUT = 5            # Seconds to receive all header lines
+BODY_TIMEOUT = 10             # Seconds to receive the request body
+MAX_HEADERS = 24              # Header lines accepted per request
+MAX_HEADER_LINE = 512         # Bytes per request/header line
+
+# Per-connection receive buffer; a request head must fit in it
+RECV_BUFFER_SIZE = 1536
+
+# Sent to clients over MAX_CONNECTIONS before closing
+BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Length: 0\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+# Size of each body chunk written to the socket by streamed responses
+RESPONSE_CHUNK_SIZE = 512
+
+# Default Cache-Control max-age for static files (0 = always revalidate)
+STATIC_MAX_AGE = 0
+
+# Server-Sent Events
+SSE_QUEUE_SIZE = 8            # Events buffered per client, oldest dropped
+SSE_MAX_CLIENTS = 2           # Concurrent event streams (each holds a connection)
+SSE_PING_INTERVAL = 15        # Seconds between keep-alive comments
+SSE_RETRY_MS = 3000           # Client reconnect delay announced on connect
+
+MIME_TYPES = {
+    "html": "text/html",
+    "css": "text/css",
+    "js": "application/javascript",
+    "json": "application/json",
+    "txt": "text/plain",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "ico": "image/x-icon",
+}
+
+HTTP_REASONS = {
+    101: "Switching Protocols",
+    200: "OK",
+    204: "No Content",
+    302: "Found",
+    304: "Not Modified",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    414: "URI Too Long",
+    426: "Upgrade Required",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    507: "Insufficient Storage",
+}
+
+
+class Response:
+    """
+    HTTP response whose headers are sent separately from its body.
+
+    The body may be:
+        - bytes or str, sent in one write;
+        - a file-like object with readinto(), streamed in
+          RESPONSE_CHUNK_SIZE chunks and closed afterwards;
+        - an iterable (e.g. a generator) or async iterator yielding bytes
+          chunks, each written and drained in turn.
+
+    Peak memory for streamed bodies is bounded by the chunk size rather
+    than the size of the content. Bodies of unknown length are sent with
+    chunked transfer encoding to HTTP/1.1 clients, so the connection can
+    be kept alive; HTTP/1.0 clients get them delimited by a close.
+    """
+
+    def __init__(self, body=b"", status: int = 200,
+                 content_type: str = "text/html", headers: dict = None,
+                 length: int = None):
+        """
+        Create a response.
+
+        Args:
+            body: Response body (see class docstring).
+            status: HTTP status code (default 200).
+            content_type: Content-Type header value (default text/html).
+            headers: Optional extra headers.
+            length: Body length in bytes, if known for streamed bodies.
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        if length is None and isinstance(body, (bytes, bytearray)):
+            length = len(body)
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers
+        self.length = length
+
+    @classmethod
+    def file(cls, path: str, content_type: str = "text/html",
+             status: int = 200, headers: dict = None):
+        """
+        Create a response streaming a file from flash.
+
+        Args:
+            path: File path.
+            content_type: Content-Type header value (default text/html).
+            status: HTTP status code (default 200).
+            headers: Optional extra headers.
+
+        Returns:
+            Response with the opened file as body.
+
+        Raises:
+            OSError: If the file cannot be opened.
+        """
+        length = os.stat(path)[6]
+        return cls(open(path, "rb"), status, content_type, headers, length)
+
+    def is_delimited(self) -> bool:
+        """Check if the client can find the end of the body without a close."""
+        return self.length is not None or self.status in (204, 304)
+
+    @classmethod
+    def json(cls, data, status: int = 200, headers: dict = None):
+        """
+        Create a response streaming data as JSON (see json_chunks()).
+
+        Args:
+            data: JSON-serializable data.
+            status: HTTP status code (default 200).
+            headers: Optional extra headers.
+
+        Returns:
+            application/json response of unknown length.
+        """
+        return cls(json_chunks(data), status, "application/json", headers)
+
+    def head(self, keep_alive: bool = False, chunked: bool = False) -> bytes:
+        """
+        Encode the status line and headers, including the blank line.
+
+        Args:
+            keep_alive: Announce that the connection stays open.
+            chunked: Announce chunked transfer encoding instead of a
+                Content-Length.
+
+        Returns:
+            Encoded header block.
+        """
+        reason = HTTP_REASONS.get(self.status, "OK")
+        lines = [f"HTTP/1.1 {self.status} {reason}"]
+        if self.content_type:
+            lines.append(f"Content-Type: {self.content_type}")
+        if chunked:
+            lines.append("Transfer-Encoding: chunked")
+        elif self.length is not None and self.status not in (204, 304):
+            lines.append(f"Content-Length: {self.length}")
+        if self.headers:
+            for key, value in self.headers.items():
+                lines.append(f"{key}: {value}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        lines.append("\r\n")
+        return "\r\n".join(lines).encode()
+
+    async def send(self, writer, keep_alive: bool = False,
+                   chunked: bool = False) -> None:
+        """
+        Write the header block, then the body, and release the body.
+
+        Args:
+            writer: uasyncio StreamWriter.
+            keep_alive: Announce that the connection stays open.
+            chunked: Send the body with chunked transfer encoding.
+        """
+        try:
+            writer.write(self.head(keep_alive, chunked))
+            body = self.body
+            if isinstance(body, (bytes, bytearray)) and not chunked:
+                # Head and body leave in one drain, the body by reference
+                if body:
+                    writer.write(memoryview(body))
+                await writer.drain()
+            else:
+                await writer.drain()
+                await self.write_body(writer, chunked)
+        finally:
+            self.close()
+
+    async def write_body(self, writer, chunked: bool = False) -> None:
+        """
+        Write the body to a stream writer, draining after each chunk.
+
+        Args:
+            writer: uasyncio StreamWriter.
+            chunked: Frame each chunk for chunked transfer encoding and
+                end with the terminating zero-length chunk.
+        """
+        body = self.body
+        if isinstance(body, (bytes, bytearray)):
+            await _write_chunk(writer, body, chunked)
+        elif hasattr(body, "readinto"):
+            buf = bytearray(RESPONSE_CHUNK_SIZE)
+            view = memoryview(buf)
+            while True:
+                n = body.readinto(buf)
+                if not n:
+                    break
+                await _write_chunk(writer, view[:n], chunked)
+        elif hasattr(body, "__anext__"):
+            async for chunk in body:
+                await _write_chunk(writer, chunk, chunked)
+        else:
+            for chunk in body:
+                await _write_chunk(writer, chunk, chunked)
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+    def close(self) -> None:
+        """Release a file or generator body."""
+        if hasattr(self.body, "close"):
+            self.body.close()
+
+
+async def _write_chunk(writer, chunk, chunked: bool) -> None:
+    """Write and drain one body chunk, framed if chunked (empty is skipped)."""
+    if not chunk:
+        return
+    if chunked:
+        writer.write(b"%x\r\n" % len(chunk))
+        writer.write(chunk)
+        writer.write(b"\r\n")
+    else:
+        writer.write(chunk)
+    await writer.drain()
+
+
+def _json_parts(value):
+    """Yield the JSON text of value piece by piece (str pieces)."""
+    if isinstance(value, dict):
+        yield "{"
+        first = True
+        for key, item in value.items():
+            yield (f"{json.dumps(str(key))}: " if first
+                   else f", {json.dumps(str(key))}: ")
+            first = False
+            yield from _json_parts(item)
+        yield "}"
+    elif isinstance(value, (list, tuple)):
+        yield "["
+        first = True
+        for item in value:
+            if not first:
+                yield ", "
+            first = False
+            yield from _json_parts(item)
+        yield "]"
+    else:
+        yield json.dumps(value)
+
+
+def json_chunks(data, chunk_size: int = RESPONSE_CHUNK_SIZE):
+    """
+    Serialize data as JSON in chunks of about chunk_size bytes.
+
+    Lists, tuples and dicts are walked item by item, so only one chunk
+    (plus the largest scalar) is held in RAM at a time instead of the
+    whole document; the output matches json.dumps().
+
+    Args:
+        data: JSON-serializable data.
+        chunk_size: Target chunk size in bytes.
+
+    Yields:
+        bytes: Consecutive pieces of the document.
+    """
+    buf = bytearray()
+    for part in _json_parts(data):
+        buf += part.encode()
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf = bytearray()
+    if buf:
+        yield bytes(buf)
+
+
+class PreparedResponse:
+    """
+    A complete response encoded once and sent from constant buffers.
+
+    Meant for fixed answers (error pages, redirects) built at startup:
+    both the keep-alive and the closing variant are encoded up front, so
+    sending one is a single write of immutable bytes.
+    """
+    __slots__ = ("status", "_keep_alive", "_close")
+
+    def __init__(self, body=b"", status: int = 200,
+                 content_type: str = "text/plain", headers: dict = None):
+        """
+        Encode a response.
+
+        Args:
+            body: Response body as bytes or str.
+            status: HTTP status code (default 200).
+            content_type: Content-Type header value (default text/plain).
+            headers: Optional extra headers.
+        """
+        response = Response(body, status, content_type, headers)
+        self.status = status
+        self._keep_alive = response.head(True) + response.body
+        self._close = response.head(False) + response.body
+
+    async def send(self, writer, keep_alive: bool = False) -> None:
+        """
+        Write the encoded response.
+
+        Args:
+            writer: uasyncio StreamWriter.
+            keep_alive: Send the variant announcing a persistent connection.
+        """
+        writer.write(self._keep_alive if keep_alive else self._close)
+        await writer.drain()
+
+
+class EventStream:
+    """
+    Publishes Server-Sent Events to all subscribed clients.
+
+    Each client gets a bounded queue of encoded events; when a slow
+    client's queue is full the oldest event is dropped, so publish()
+    never waits on the network. Events are encoded once per publish()
+    and shared by all queues.
+
+    Usage:
+        events = EventStream()
+        server.add_route("/events", lambda request: events.response())
+        events.publish("state", {"name": "CONNECTED"})
+    """
+
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE,
+                 max_clients: int = SSE_MAX_CLIENTS,
+                 ping_interval: int = SSE_PING_INTERVAL):
+        """
+        Create an event stream without subscribers.
+
+        Args:
+            queue_size: Events buffered per client (default 8).
+            max_clients: Concurrent subscribers; more get a 503 (default 2).
+            ping_interval: Seconds between keep-alive comments sent to
+                idle clients (default 15).
+        """
+        self._queue_size = queue_size
+        self._max_clients = max_clients
+        self._ping_interval = ping_interval
+        self._clients = []
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @staticmethod
+    def encode(event: str, data) -> bytes:
+        """
+        Encode one event.
+
+        Args:
+            event: Event name.
+            data: JSON-serializable payload.
+
+        Returns:
+            Encoded event, including the terminating blank line.
+        """
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+    def publish(self, event: str, data=None) -> None:
+        """
+        Queue an event for every subscriber.
+
+        Args:
+            event: Event name.
+            data: JSON-serializable payload.
+        """
+        if not self._clients:
+            return
+        message = EventStream.encode(event, data)
+        for client in self._clients:
+            client.push(message)
+
+    def response(self, event: str = None, data=None) -> Response:
+        """
+        Subscribe a client and build its streaming response.
+
+        Args:
+            event: Optional event sent first (e.g. a state snapshot).
+            data: Payload of that event.
+
+        Returns:
+            text/event-stream response, or 503 if max_clients are
+            already subscribed. The subscription ends when the response
+            is closed.
+        """
+        if len(self._clients) >= self._max_clients:
+            return Response("Too many event streams", 503, "text/plain",
+                            {"Retry-After": self._ping_interval})
+        client = _EventClient(self, self._queue_size, self._ping_interval)
+        if event is not None:
+            client.push(EventStream.encode(event, data))
+        self._clients.append(client)
+        return Response(client, 200, "text/event-stream",
+                        {"Cache-Control": "no-cache"})
+
+    def _remove(self, client) -> None:
+        """Unsubscribe a client."""
+        if client in self._clients:
+            self._clients.remove(client)
+
+
+class _EventClient:
+    """One subscriber's event queue, iterated as response body chunks."""
+
+    def __init__(self, stream: EventStream, size: int, ping_interval: int):
+        self._stream = stream
+        self._size = size
+        self._ping_interval = ping_interval
+        self._queue = [f"retry: {SSE_RETRY_MS}\n\n".encode()]
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    def push(self, message: bytes) -> None:
+        """Queue an encoded event, dropping the oldest if full."""
+        if len(self._queue) >= self._size:
+            self._queue.pop(0)
+            self._stream.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        while not self._queue and not self._closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self._ping_interval)
+            except asyncio.TimeoutError:
+                return b": ping\n\n"
+            self._ready.clear()
+        if self._closed:
+            raise StopAsyncIteration
+        return self._queue.pop(0)
+
+    def close(self) -> None:
+        """End the stream and unsubscribe."""
+        if not self._closed:
+            self._closed = True
+            self._stream._remove(self)
+            self._ready.set()
+
+
+# Hex digit value per byte, 0xFF for non-hex bytes
+_HEX_VALUES = bytes(
+    c - 0x30 if 0x30 <= c <= 0x39 else
+    (c | 0x20) - 0x57 if 0x61 <= (c | 0x20) <= 0x66 else 0xFF
+    for c in range(256)
+)
+
+
+def _decode_field(data: bytes, view, start: int, end: int, out) -> str:
+    """
+    Percent-decode data[start:end] into out and decode it as UTF-8.
+
+    Args:
+        data: URL-encoded bytes.
+        view: memoryview of data, to copy runs without slicing data.
+        start: Offset of the field.
+        end: Offset just past the field.
+        out: Scratch memoryview of at least end - start bytes.
+
+    Returns:
+        Decoded string.
+    """
+    hex_values = _HEX_VALUES
+    n = 0
+    mark = data.find(b"%", start, end)
+    while mark >= 0:
+        if mark > start:
+            out[n:n + mark - start] = view[start:mark]
+            n += mark - start
+        out[n] = 0x25
+        start = mark + 1
+        if mark + 2 < end:
+            # Valid escape: both digits below 16 in the lookup table
+            high = hex_values[data[mark + 1]]
+            low = hex_values[data[mark + 2]]
+            if high | low < 16:
+                out[n] = (high << 4) | low
+                start = mark + 3
+        n += 1
+        # Escapes tend to come in runs (UTF-8 sequences)
+        if start < end and data[start] == 0x25:
+            mark = start
+        else:
+            mark = data.find(b"%", start, end)
+    if end > start:
+        out[n:n + end - start] = view[start:end]
+        n += end - start
+    return _decode_text(out[:n])
+
+
+def _decode_text(data) -> str:
+    """Decode bytes as UTF-8, falling back to one char per byte."""
+    try:
+        return str(data, 'utf-8')
+    except UnicodeError:
+        return "".join(chr(b) for b in data)
+
+
+def parse_params(data) -> dict:
+    """
+    Parse URL-encoded form data or a query string.
+
+    Works on bytes: fields are located by offset, escaped ones are
+    percent-decoded into one scratch buffer, and every key and value is
+    decoded as UTF-8 once, so multi-byte characters (e.g. %E5%8F%B0) come
+    out right. A field without '=' maps to "".
+
+    Args:
+        data: Encoded data as bytes, bytearray, memoryview or str.
+
+    Returns:
+        Parsed key-value pairs.
+    """
+    params = {}
+    if not data:
+        return params
+    if isinstance(data, str):
+        data = data.encode()
+    elif not isinstance(data, bytes):
+        data = bytes(data)
+
+    # '+' is a space only when literal, so translate it before unescaping
+    if b"+" in data:
+        data = data.replace(b"+", b" ")
+    view = memoryview(data)
+    out = memoryview(bytearray(len(data)))
+    end = len(data)
+    escape = data.find(b"%")
+    pos = 0
+    while pos < end:
+        amp = data.find(b"&", pos)
+        if amp < 0:
+            amp = end
+        if amp > pos:
+            eq = data.find(b"=", pos, amp)
+            split = amp if eq < 0 else eq
+            if 0 <= escape < amp:
+                # Only fields holding a '%' go through the scratch buffer
+                key = _decode_field(data, view, pos, split, out)
+                value = _decode_field(data, view, eq + 1, amp, out) if eq >= 0 else ""
+                escape = data.find(b"%", amp)
+            else:
+                try:
+                    key = data[pos:split].decode('utf-8')
+                    value = data[eq + 1:amp].decode('utf-8') if eq >= 0 else ""
+                except UnicodeError:
+                    key = _decode_text(data[pos:split])
+                    value = _decode_text(data[eq + 1:amp]) if eq >= 0 else ""
+            params[key] = value
+        pos = amp + 1
+    return params
+
+
+def _ieq(buf, pos: int, name: bytes) -> bool:
+    """Compare buf[pos:] with a lowercase ASCII name, ignoring case."""
+    for i in range(len(name)):
+        if buf[pos + i] | 0x20 != name[i]:
+            return False
+    return True
+
+
+def _skip_spaces(buf, pos: int, end: int) -> int:
+    """Return the first offset in buf[pos:end] that is not a space/tab."""
+    while pos < end and buf[pos] in (0x20, 0x09):
+        pos += 1
+    return pos
+
+
+class RequestError(Exception):
+    """A request violated a server limit and must be answered with status."""
+
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+class Request:
+    """
+    A parsed HTTP request.
+
+    The header block stays in the connection's receive buffer and is only
+    decoded when a handler asks for it (header() or headers). The body is
+    kept as bytes and decoded/parsed on first access. Request data is only
+    valid until the handler returns, since the buffer is reused for the
+    next request on the connection.
+
+    Dict-style access (request["params"], request.get("headers")) is
+    supported for handlers written against the old request dict.
+    """
+    __slots__ = ("method", "path", "query_string", "version",
+                 "content_length", "keep_alive", "stream", "_buf", "_hstart",
+                 "_hend", "_body", "_headers", "_params", "_query",
+                 "_path_params")
+
+    _FIELDS = ("method", "path", "query_string", "version", "headers", "body",
+               "params", "query", "path_params", "content_length")
+
+    def __init__(self, method: str, path: str, version: str, buf,
+                 hstart: int, hend: int, content_length: int,
+                 keep_alive: bool, query_string: str = ""):
+        """
+        Create a request over a parsed header block.
+
+        Args:
+            method: HTTP method.
+            path: Request path, without the query string.
+            version: HTTP version string.
+            buf: Buffer holding the header block.
+            hstart: Offset of the first header line.
+            hend: Offset just past the last header line's CRLF.
+            content_length: Declared body length.
+            keep_alive: The client allows reusing the connection.
+            query_string: Raw text after '?' in the request target.
+        """
+        self.method = method
+        self.path = path
+        self.query_string = query_string
+        self.stream = None
+        self.version = version
+        self.content_length = content_length
+        self.keep_alive = keep_alive
+        self._buf = buf
+        self._hstart = hstart
+        self._hend = hend
+        self._body = None
+        self._headers = None
+        self._params = None
+        self._query = None
+        self._path_params = None
+
+    def header(self, name: str, default: str = None) -> str:
+        """
+        Look up one header without decoding the others.
+
+        Args:
+            name: Header name (case-insensitive).
+            default: Value returned if the header is absent.
+
+        Returns:
+            Header value with surrounding whitespace stripped.
+        """
+        if self._headers is not None:
+            return self._headers.get(name.lower(), default)
+        key = name.lower().encode()
+        buf = self._buf
+        pos = self._hstart
+        while pos < self._hend:
+            eol = buf.find(b"\r\n", pos, self._hend)
+            if eol - pos > len(key) and buf[pos + len(key)] == 0x3A:
+                if _ieq(buf, pos, key):
+                    start = _skip_spaces(buf, pos + len(key) + 1, eol)
+                    return str(buf[start:eol], 'utf-8').strip()
+            pos = eol + 2
+        return default
+
+    @property
+    def headers(self) -> dict:
+        """All headers, keys lowercased (decoded on first access)."""
+        if self._headers is None:
+            headers = {}
+            block = bytes(self._buf[self._hstart:self._hend])
+            try:
+                text = block.decode('utf-8')
+            except UnicodeError:
+                text = ""
+            for line in text.split("\r\n"):
+                if ':' in line:
+                    key, value = line.split(":", 1)
+                    headers[key.lower().strip()] = value.strip()
+            self._headers = headers
+        return self._headers
+
+    @property
+    def body_bytes(self):
+        """Raw body (memoryview or bytearray), empty if there is none."""
+        return self._body if self._body is not None else b""
+
+    @property
+    def body(self) -> str:
+        """Body decoded as UTF-8 ("" if absent or undecodable)."""
+        if self._body is None:
+            return ""
+        try:
+            return bytes(self._body).decode('utf-8')
+        except UnicodeError:
+            return ""
+
+    @property
+    def params(self) -> dict:
+        """URL-encoded form fields of a POST body (parsed on first access)."""
+        if self._params is None:
+            if self.method == "POST" and self._body is not None:
+                self._params = parse_params(self._body)
+            else:
+                self._params = {}
+        return self._params
+
+    @property
+    def query(self) -> dict:
+        """Query string parameters (parsed on first access)."""
+        if self._query is None:
+            self._query = parse_params(self.query_string)
+        return self._query
+
+    @property
+    def path_params(self) -> dict:
+        """Values captured by a parameterized route (empty otherwise)."""
+        if self._path_params is None:
+            self._path_params = {}
+        return self._path_params
+
+    @path_params.setter
+    def path_params(self, value: dict) -> None:
+        self._path_params = value
+
+    def __getitem__(self, key: str):
+        if key not in Request._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        """Dict-style access to request fields."""
+        if key not in Request._FIELDS:
+            return default
+        return getattr(self, key)
+
+
+class RequestParser:
+    """
+    Reads requests off one connection through a single reused buffer.
+
+    Data is pulled with readinto() into a RECV_BUFFER_SIZE bytearray.
+    Header lines are only scanned for framing (Content-Length, Connection)
+    and limit checks; a body that fits in the buffer is exposed as a
+    memoryview, a larger one is read into a buffer sized from
+    Content-Length. Bytes past the current request (pipelining) stay in
+    the buffer for the next one.
+    """
+
+    def __init__(self, reader, max_headers: int = MAX_HEADERS,
+                 max_header_line: int = MAX_HEADER_LINE,
+                 size: int = RECV_BUFFER_SIZE):
+        """
+        Create a parser for a connection.
+
+        Args:
+            reader: uasyncio StreamReader of the connection.
+            max_headers: Header lines accepted per request.
+            max_header_line: Bytes per request or header line.
+            size: Receive buffer size.
+        """
+        self._reader = reader
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self._max_headers = max_headers
+        self._max_line = max_header_line
+
+    def _compact(self) -> None:
+        """Move unconsumed data to the front of the buffer."""
+        n = self._end - self._start
+        if self._start:
+            self._buf[0:n] = self._buf[self._start:self._end]
+            self._start = 0
+            self._end = n
+
+    async def _fill(self) -> bool:
+        """
+        Read more data into the buffer.
+
+        Returns:
+            False if the client closed the connection.
+
+        Raises:
+            RequestError: 431 if the buffer is full without a complete head.
+        """
+        if self._end == len(self._buf):
+            if self._start == 0:
+                raise RequestError(431)
+            self._compact()
+        view = self._view[self._end:] if self._end else self._view
+        while True:
+            n = await self._reader.readinto(view)
+            if n is not None:
+                break
+        if not n:
+            return False
+        self._end += n
+        return True
+
+    async def read_into(self, buf, limit: int) -> int:
+        """
+        Read body bytes into a caller's buffer, buffered data first.
+
+        Args:
+            buf: Writable buffer (bytearray or memoryview).
+            limit: Maximum bytes to read.
+
+        Returns:
+            Bytes read, 0 if the client closed the connection.
+        """
+        n = min(len(buf), limit)
+        available = self._end - self._start
+        if available:
+            n = min(n, available)
+            buf[0:n] = self._view[self._start:self._start + n]
+            self._start += n
+            return n
+        view = memoryview(buf)[:n]
+        while True:
+            got = await self._reader.readinto(view)
+            if got is not None:
+                return got
+
+    async def take(self, n: int):
+        """
+        Consume exactly n bytes, reading more as needed.
+
+        Used for framed protocols after a connection upgrade.
+
+        Args:
+            n: Byte count, at most the buffer size.
+
+        Returns:
+            memoryview of the bytes (valid until the next call), or None
+            if the client closed the connection first.
+        """
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._start + n > len(self._buf):
+            self._compact()
+        while self._end - self._start < n:
+            if not await self._fill():
+                return None
+        start = self._start
+        self._start += n
+        return self._view[start:start + n]
+
+    async def wait_request_line(self) -> bool:
+        """
+        Wait until a complete request line is buffered.
+
+        Returns:
+            False if the client closed the connection first.
+
+        Raises:
+            RequestError: 414 if the request line is too long.
+        """
+        buf = self._buf
+        if self._start == self._end:
+            self._start = self._end = 0
+        while True:
+            # Skip stray CRLFs between pipelined requests
+            while (self._end - self._start >= 2 and buf[self._start] == 0x0D
+                   and buf[self._start + 1] == 0x0A):
+                self._start += 2
+            if buf.find(b"\r\n", self._start, self._end) >= 0:
+                return True
+            if self._end - self._start > self._max_line:
+                raise RequestError(414)
+            if not await self._fill():
+                return False
+
+    async def read_head(self) -> Request:
+        """
+        Read and scan the request line and headers.
+
+        Returns:
+            The request, or None if the client closed the connection or
+            sent a malformed request line.
+
+        Raises:
+            RequestError: 414/431 if line or header limits are exceeded.
+        """
+        buf = self._buf
+        while True:
+            idx = buf.find(b"\r\n\r\n", self._start, self._end)
+            if idx >= 0:
+                break
+            if not await self._fill():
+                return None
+
+        start = self._start
+        self._start = idx + 4
+        line_end = buf.find(b"\r\n", start, idx + 2)
+        if line_end - start > self._max_line:
+            raise RequestError(414)
+        try:
+            parts = buf[start:line_end].decode('utf-8').split(" ", 2)
+        except UnicodeError:
+            return None
+        if len(parts) < 2:
+            return None
+        version = parts[2].strip() if len(parts) > 2 else "HTTP/1.0"
+        path = parts[1]
+        query_string = ""
+        mark = path.find("?")
+        if mark >= 0:
+            query_string = path[mark + 1:]
+            path = path[:mark]
+
+        # Scan header lines for limits and framing, without decoding them
+        content_length = 0
+        connection = None
+        count = 0
+        hstart = line_end + 2
+        pos = hstart
+        while pos < idx + 2:
+            eol = buf.find(b"\r\n", pos, idx + 2)
+            count += 1
+            if count > self._max_headers or eol - pos > self._max_line:
+                raise RequestError(431)
+            colon = buf.find(b":", pos, eol)
+            # Both framing headers start with 'c'; skip the rest cheaply
+            if buf[pos] | 0x20 != 0x63:
+                pass
+            elif colon - pos == 14 and _ieq(buf, pos, b"content-length"):
+                content_length = 0
+                for i in range(_skip_spaces(buf, colon + 1, eol), eol):
+                    digit = buf[i] - 0x30
+                    if not 0 <= digit <= 9:
+                        break
+                    content_length = content_length * 10 + digit
+            elif colon - pos == 10 and _ieq(buf, pos, b"connection"):
+                value = _skip_spaces(buf, colon + 1, eol)
+                if eol - value >= 5 and _ieq(buf, value, b"close"):
+                    connection = "close"
+                elif eol - value >= 10 and _ieq(buf, value, b"keep-alive"):
+                    connection = "keep-alive"
+            pos = eol + 2
+
+        # HTTP/1.1 defaults to persistent connections, HTTP/1.0 to close
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+        return Request(parts[0], path, version, buf, hstart,
+                       idx + 2, content_length, keep_alive, query_string)
+
+    async def read_body(self, request: Request) -> bool:
+        """
+        Read the body of request.
+
+        Args:
+            request: Request returned by read_head().
+
+        Returns:
+            False if the client closed the connection early.
+        """
+        n = request.content_length
+        size = len(self._buf)
+        if n <= size:
+            # Keep the body in the receive buffer
+            if self._start + n > size:
+                # Decode the header block before compaction moves it
+                request._headers = request.headers
+                self._compact()
+            while self._end - self._start < n:
+                if not await self._fill():
+                    return False
+            request._body = self._view[self._start:self._start + n]
+            self._start += n
+            return True
+
+        # Larger than the buffer: read into one buffer of the exact size
+        body = bytearray(n)
+        view = memoryview(body)
+        have = self._end - self._start
+        view[0:have] = self._view[self._start:self._end]
+        self._start = self._end = 0
+        while have < n:
+            got = await self._reader.readinto(view[have:])
+            if got is None:
+                continue
+            if not got:
+                return False
+            have += got
+        request._body = body
+        return True
+
+
+class BodyReader:
+    """
+    Reads the body of a streaming route straight off the connection.
+
+    Set as request.stream for routes added with stream=True, which are
+    exempt from MAX_CONTENT_LENGTH; the handler pulls the body through
+    its own fixed buffer instead of the server buffering it. A body left
+    partly unread closes the connection after the response.
+    """
+    __slots__ = ("remaining", "_parser", "_timeout")
+
+    def __init__(self, parser: RequestParser, length: int, timeout: int):
+        """
+        Create a reader over a request body.
+
+        Args:
+            parser: Connection parser (may hold the first body bytes).
+            length: Content-Length of the body.
+            timeout: Seconds allowed per read.
+        """
+        self.remaining = length
+        self._parser = parser
+        self._timeout = timeout
+
+    async def readinto(self, buf) -> int:
+        """
+        Read the next part of the body.
+
+        Args:
+            buf: Writable buffer (bytearray or memoryview).
+
+        Returns:
+            Bytes read, 0 once the whole body has been read.
+
+        Raises:
+            asyncio.TimeoutError: If no data arrives within the timeout.
+            EOFError: If the client closed the connection early.
+        """
+        if self.remaining <= 0:
+            return 0
+        n = await asyncio.wait_for(
+            self._parser.read_into(buf, self.remaining), self._timeout
+        )
+        if not n:
+            raise EOFError("Incomplete body")
+        self.remaining -= n
+        return n
+
+
+def static_response(request: Request, path: str, content_type: str = None,
+                    max_age: int = STATIC_MAX_AGE) -> Response:
+    """
+    Build a cacheable response for a static file on flash.
+
+    A precompressed sibling (path + ".gz") is preferred when the client
+    accepts gzip. The ETag is derived from the size and mtime of the file
+    actually served, and a matching If-None-Match gets a bodyless 304.
+
+    Args:
+        request: Request (Accept-Encoding and If-None-Match are consulted).
+        path: File path on flash.
+        content_type: Content-Type, guessed from the extension if None.
+        max_age: Cache-Control max-age in seconds (0 sends no-cache).
+
+    Returns:
+        200 streaming response, 304, or 404 if the file doesn't exist.
+    """
+    if content_type is None:
+        ext = path.rsplit(".", 1)[-1].lower()
+        content_type = MIME_TYPES.get(ext, "application/octet-stream")
+
+    candidates = [path]
+    if "gzip" in request.header("accept-encoding", ""):
+        candidates.insert(0, path + ".gz")
+
+    for candidate in candidates:
+        try:
+            stat = os.stat(candidate)
+        except OSError:
+            continue
+        extra = {
+            "ETag": f'"{stat[6]:x}-{stat[8]:x}"',
+            "Cache-Control": f"max-age={max_age}" if max_age else "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if candidate != path:
+            extra["Content-Encoding"] = "gzip"
+
+        if request.header("if-none-match") == extra["ETag"]:
+            return Response(b"", 304, None, extra)
+        try:
+            return Response(open(candidate, "rb"), 200, content_type,
+                            extra, stat[6])
+        except OSError:
+            continue
+    return Response("Not Found", 404, "text/plain")
+
 
 class WebServer:
     """
     A lightweight asynchronous HTTP server designed for device provisioning.
-    Supports basic routing, header parsing, and URL-encoded body parameters.
+    Supports routing, header parsing, and URL-encoded body parameters.
+
+    Routes are compiled when added and matched on the path alone (the
+    query string is split off while parsing):
+        - exact paths ('/scan') are a single dict lookup;
+        - parameterised paths ('/api/<name>') match one segment per
+          parameter and fill request.path_params;
+        - prefix paths ending in '*' ('/static/*') match anything below,
+          longest prefix first.
+    A known path requested with an unregistered method gets a 405 with an
+    Allow header; only unknown GET paths get the captive portal fallback.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        keepalive_timeout: int = KEEPALIVE_TIMEOUT,
+        max_requests: int = KEEPALIVE_MAX_REQUESTS,
+        max_connections: int = MAX_CONNECTIONS,
+        request_timeout: int = REQUEST_LINE_TIMEOUT,
+        header_timeout: int = HEADER_TIMEOUT,
+        body_timeout: int = BODY_TIMEOUT,
+        max_headers: int = MAX_HEADERS,
+        max_header_line: int = MAX_HEADER_LINE,
+        max_streams: int = MAX_STREAMS
+    ):
+        """
+        Initialize the web server.
+
+        Args:
+            keepalive_timeout: Seconds an idle persistent connection is
+                kept open waiting for the next request (default 5).
+            max_requests: Requests served per connection before it is
+                closed (default 10, 1 disables keep-alive).
+            max_connections: Concurrent connections; extra clients get an
+                immediate 503 and are closed (default 4).
+            request_timeout: Seconds to receive the first request line
+                of a connection (default 5).
+            header_timeout: Seconds to receive all headers (default 5).
+            body_timeout: Seconds to receive the body (default 10).
+            max_headers: Header lines accepted per request (default 24).
+            max_header_line: Bytes per request or header line (default 512).
+            max_streams: Connections that event streams and WebSockets
+                may hold together, leaving the rest of max_connections
+                for plain requests; more get a 503 (default 2).
+        """
         self._log = Logger("WebServer")
-        self._routes = {}
+        self._not_found = PreparedResponse("Not Found", 404)
+        self._routes = {}          # path -> {method: handler}
+        self._param_routes = []    # (compiled segments, {method: handler})
+        self._prefix_routes = []   # (prefix, {method: handler}), longest first
+        self._ws_routes = {}       # path -> WebSocket handler
+        self._websockets = 0
         self._running = False
         self._server = None
+        self._keepalive_timeout = keepalive_timeout
+        self._max_requests = max(1, max_requests)
+        self._max_connections = max_connections
+        self._request_timeout = request_timeout
+        self._header_timeout = header_timeout
+        self._body_timeout = body_timeout
+        self._max_headers = max_headers
+        self._max_header_line = max_header_line
+        self._max_streams = max_streams
+
+        # Connection accounting
+        self._active = 0
+        self._streams = 0
+        self._stats = {
+            "requests": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "oversized": 0,
+        }
 
-    def add_route(self, path: str, handler, method: str = "GET") -> None:
+    def add_route(self, path: str, handler, method: str = "GET",
+                  stream: bool = False) -> None:
         """
         Register a handler for a specific URL path and HTTP method.
 
         Args:
-            path: The URL path (e.g., '/').
-            handler: Async function to handle the request.
+            path: The URL path: exact ('/'), with '<name>' segments
+                ('/api/<name>') or a prefix ending in '*' ('/static/*').
+            handler: Async function to handle the request, returning a
+                Response, a PreparedResponse or a complete encoded HTTP
+                response (bytes, sent with a connection close).
             method: HTTP method (default 'GET').
+            stream: Leave the body unread and exempt from
+                MAX_CONTENT_LENGTH; the handler reads it through
+                request.stream (a BodyReader).
+        """
+        if "<" in path:
+            segments = tuple(
+                (True, seg[1:-1]) if seg[:1] == "<" and seg[-1:] == ">"
+                else (False, seg)
+                for seg in path.strip("/").split("/")
+            )
+            methods = self._find_methods(self._param_routes, segments)
+        elif path.endswith("*"):
+            methods = self._find_methods(self._prefix_routes, path[:-1])
+            self._prefix_routes.sort(key=lambda route: -len(route[0]))
+        else:
+            methods = self._routes.setdefault(path, {})
+        methods[method] = (handler, stream)
+
+    @staticmethod
+    def _find_methods(table: list, key) -> dict:
+        """Get (or add) the method map of a pattern route."""
+        for route_key, methods in table:
+            if route_key == key:
+                return methods
+        methods = {}
+        table.append((key, methods))
+        return methods
+
+    def _match(self, request: Request) -> dict:
+        """
+        Find the method map for a request path.
+
+        Args:
+            request: The request; path_params is filled for
+                parameterised routes.
+
+        Returns:
+            dict: method -> (handler, stream), or None if no route matches.
+        """
+        path = request.path
+        methods = self._routes.get(path)
+        if methods is not None:
+            return methods
+        if self._param_routes:
+            parts = path.strip("/").split("/")
+            for segments, methods in self._param_routes:
+                if len(segments) != len(parts):
+                    continue
+                params = {}
+                for (is_param, text), part in zip(segments, parts):
+                    if is_param:
+                        params[text] = part
+                    elif text != part:
+                        break
+                else:
+                    request.path_params = params
+                    return methods
+        for prefix, methods in self._prefix_routes:
+            if path.startswith(prefix):
+                return methods
+        return None
+
+    def add_websocket(self, path: str, handler) -> None:
+        """
+        Accept WebSocket upgrades on a URL path.
+
+        The handler is called as handler(ws, request) with a
+        websocket.WebSocket; the connection is closed when it returns.
+        The request's header and body data are only valid until the first
+        ws.receive(), which reuses the connection buffer.
+
+        Args:
+            path: Exact URL path (e.g., '/ws').
+            handler: Async function serving the socket.
+        """
+        self._ws_routes[path] = handler
+
+    def add_static(self, path: str, file_path: str, content_type: str = None,
+                   max_age: int = STATIC_MAX_AGE) -> None:
+        """
+        Serve a file from flash at a URL path (see static_response()).
+
+        Args:
+            path: The URL path (e.g., '/style.css').
+            file_path: File path on flash; a '.gz' sibling is preferred.
+            content_type: Content-Type, guessed from the extension if None.
+            max_age: Cache-Control max-age in seconds (0 sends no-cache).
+        """
+        async def handler(request):
+            return static_response(request, file_path, content_type, max_age)
+        self.add_route(path, handler)
+
+    def get_stats(self) -> dict:
+        """
+        Get connection counters.
+
+        Returns:
+            dict: active connections, open streams (event streams and
+                  websockets) and websockets, requests served, rejected
+                  (over max_connections, max_streams or WebSocket limit),
+                  timeouts (slow request line, headers or body) and
+                  oversized (header limits exceeded).
         """
-        self._routes[(path, method)] = handler
+        stats = dict(self._stats)
+        stats["active"] = self._active
+        stats["streams"] = self._streams
+        stats["websockets"] = self._websockets
+        return stats
 
     async def start(self, host: str = '0.0.0.0', port: int = 80) -> None:
         """Starts the asynchronous HTTP server."""
@@ -47,138 +1337,265 @@ class WebServer:
             self._log.info("Stopped")
 
     async def _handle_client(self, reader, writer) -> None:
-        """Internal handler for individual client connections."""
-        try:
-            request_line = await reader.readline()
-            if not request_line:
-                writer.close()
-                return
+        """
+        Internal handler for individual client connections.
 
-            # Decode request line
+        Serves requests on the same connection (HTTP/1.1 keep-alive,
+        including pipelined requests) until the client closes it, it stays
+        idle for keepalive_timeout, or max_requests have been served.
+        Clients beyond max_connections are refused with a 503.
+        """
+        if self._active >= self._max_connections:
+            self._stats["rejected"] += 1
             try:
-                request_line = request_line.decode('utf-8').strip()
-            except UnicodeError:
-                writer.close()
-                return
-            if not request_line:
-                writer.close()
-                return
-
-            parts = request_line.split(" ", 2)
-            if len(parts) < 2:
+                writer.write(BUSY_RESPONSE)
+                await writer.drain()
                 writer.close()
-                return
-            method, path = parts[0], parts[1]
-
-            # Read and parse headers to extract content length for POST requests
-            headers = {}
-            content_length = 0
-            while True:
-                line = await reader.readline()
-                if not line or line == b'\r\n':
-                    break
+                await writer.wait_closed()
+            except (OSError, asyncio.TimeoutError):
+                pass
+            return
 
+        self._active += 1
+        parser = RequestParser(reader, self._max_headers, self._max_header_line)
+        try:
+            for served in range(self._max_requests):
+                last = served == self._max_requests - 1
+                timeout = (self._request_timeout if served == 0
+                           else self._keepalive_timeout)
                 try:
-                    line_str = line.decode('utf-8').strip()
-                except UnicodeError:
-                    continue
-                if ':' in line_str:
-                    key, value = line_str.split(":", 1)
-                    key = key.lower().strip()
-                    headers[key] = value.strip()
-                    if key == 'content-length':
-                        try:
-                            # Enforce maximum content length for security
-                            content_length = min(int(value.strip()), MAX_CONTENT_LENGTH)
-                        except ValueError:
-                            content_length = 0
-
-            # Read Body if it's a POST request
-            body = ""
-            if method == "POST" and content_length > 0:
-                body_bytes = b""
-                remaining = content_length
-                while remaining > 0:
-                    chunk = await reader.read(remaining)
-                    if not chunk:
+                    if not await asyncio.wait_for(
+                        parser.wait_request_line(), timeout
+                    ):
                         break
-                    body_bytes += chunk
-                    remaining -= len(chunk)
-                if len(body_bytes) < content_length:
-                    self._log.warning(
-                        f"Incomplete body: got {len(body_bytes)}"
-                        f"/{content_length} bytes"
-                    )
-                try:
-                    body = body_bytes.decode('utf-8')
-                except UnicodeError:
-                    body = ""
-
-            # Construct request context
-            request = {
-                "method": method,
-                "path": path,
-                "headers": headers,
-                "body": body,
-                "params": self._parse_params(body) if body else {}
-            }
-
-            # Find and execute the registered route handler
-            handler = self._routes.get((path, method))
-
-            # Captive Portal Fallback: redirect any unknown GET requests to the root
-            if not handler and method == "GET":
-                handler = self._routes.get(("/", "GET"))
-
-            if handler:
-                response = await handler(request)
-                writer.write(response)
-                await writer.drain()
-            else:
-                writer.write(b"HTTP/1.1 404 Not Found\r\n\r\nNot Found")
-                await writer.drain()
+                except asyncio.TimeoutError:
+                    # An idle keep-alive connection expiring is not a fault
+                    if served == 0:
+                        self._stats["timeouts"] += 1
+                    break
+                except RequestError as e:
+                    await self._reject(writer, e.status, "oversized")
+                    break
+                if not await self._handle_request(parser, writer, last):
+                    break
 
         except Exception as e:
             self._log.error(f"Handler error: {e}")
         finally:
+            self._active -= 1
             try:
                 writer.close()
                 await writer.wait_closed()
             except (OSError, asyncio.TimeoutError):
                 pass
 
-    def _parse_params(self, body: str) -> dict:
+    async def _reject(self, writer, status: int, counter: str) -> bool:
+        """
+        Count a limit violation and answer it with a closing error.
+
+        Args:
+            writer: uasyncio StreamWriter.
+            status: HTTP status code to send.
+            counter: Stats key to increment.
+
+        Returns:
+            False (the connection must be closed).
         """
-        Parses URL-encoded form data from the request body.
+        self._stats[counter] += 1
+        reason = HTTP_REASONS.get(status, "Error")
+        await self._send_response(
+            writer, Response(reason, status, "text/plain"), False
+        )
+        return False
+
+    async def _handle_request(self, parser: RequestParser, writer,
+                              last: bool) -> bool:
+        """
+        Parse and answer one request on a connection.
 
         Args:
-            body: The raw body string.
+            parser: Connection parser with a complete request line buffered.
+            writer: uasyncio StreamWriter.
+            last: This is the final request allowed on the connection.
 
         Returns:
-            Parsed key-value pairs.
+            True if the connection can be reused for another request.
         """
-        params = {}
-        if not body:
-            return params
         try:
-            pairs = body.split('&')
-            for pair in pairs:
-                if '=' in pair:
-                    key, value = pair.split('=', 1)
-                    # Basic URL-decoding: replace '+' with space and decode '%' sequences
-                    value = value.replace('+', ' ')
-                    parts = value.split('%')
-                    decoded_value = parts[0]
-                    for part in parts[1:]:
-                        if len(part) >= 2:
-                            try:
-                                char_code = int(part[:2], 16)
-                                decoded_value += chr(char_code) + part[2:]
-                            except ValueError:
-                                decoded_value += '%' + part
-                        else:
-                            decoded_value += '%' + part
-                    params[key] = decoded_value
+            request = await asyncio.wait_for(
+                parser.read_head(), self._header_timeout
+            )
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            return False
+        except RequestError as e:
+            return await self._reject(writer, e.status, "oversized")
+        if request is None:
+            return False
+
+        ws_handler = self._ws_routes.get(request.path)
+        if ws_handler and request.method == "GET":
+            self._stats["requests"] += 1
+            return await self._upgrade(parser, writer, request, ws_handler)
+
+        # Find the route before reading the body, which streaming routes
+        # read themselves
+        keep_alive = request.keep_alive and not last
+        response = None
+        route = None
+        methods = self._match(request)
+        if methods is None:
+            # Captive Portal Fallback: unknown GET paths get the root page
+            if request.method == "GET":
+                methods = self._routes.get("/")
+                route = methods.get("GET") if methods else None
+        else:
+            route = methods.get(request.method)
+            if route is None:
+                response = Response("Method Not Allowed", 405, "text/plain",
+                                    {"Allow": ", ".join(methods)})
+        stream = route is not None and route[1]
+
+        if not stream:
+            # Enforce maximum content length for security. The unread
+            # excess would be parsed as the next request, so the
+            # connection is closed.
+            if request.content_length > MAX_CONTENT_LENGTH:
+                self._log.warning(f"Body too large: {request.content_length} bytes")
+                return await self._reject(writer, 413, "oversized")
+
+            # Read Body (consumed for any method to keep the stream in sync)
+            if request.content_length > 0:
+                try:
+                    complete = await asyncio.wait_for(
+                        parser.read_body(request), self._body_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self._stats["timeouts"] += 1
+                    return False
+                if not complete:
+                    self._log.warning("Incomplete body")
+                    return False
+        self._stats["requests"] += 1
+
+        if response is None:
+            if stream:
+                request.stream = BodyReader(
+                    parser, request.content_length, self._body_timeout
+                )
+                response = await route[0](request)
+                keep_alive = keep_alive and not request.stream.remaining
+            elif route:
+                response = await route[0](request)
+            else:
+                response = self._not_found
+        if isinstance(response, Response) and response.content_type == "text/event-stream":
+            return await self._send_stream(
+                writer, response, keep_alive, request.version == "HTTP/1.1"
+            )
+        return await self._send_response(
+            writer, response, keep_alive, request.version == "HTTP/1.1"
+        )
+
+    async def _upgrade(self, parser: RequestParser, writer, request: Request,
+                       handler) -> bool:
+        """
+        Complete a WebSocket handshake and run the socket handler.
+
+        Args:
+            parser: Connection parser (its buffer carries the frames).
+            writer: uasyncio StreamWriter.
+            request: The upgrade request.
+            handler: WebSocket handler registered for the path.
+
+        Returns:
+            False (the connection is closed afterwards).
+        """
+        upgrade = request.header("upgrade", "")
+        key = request.header("sec-websocket-key")
+        if upgrade.lower() != "websocket" or not key:
+            return await self._send_response(
+                writer, Response("WebSocket upgrade expected", 400, "text/plain"), False
+            )
+        if request.header("sec-websocket-version") != "13":
+            return await self._send_response(writer, Response(
+                "Unsupported WebSocket version", 426, "text/plain",
+                {"Sec-WebSocket-Version": "13"}
+            ), False)
+        if self._websockets >= WS_MAX_CLIENTS or self._streams >= self._max_streams:
+            return await self._reject(writer, 503, "rejected")
+
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+
+        ws = WebSocket(parser, writer)
+        self._websockets += 1
+        self._streams += 1
+        try:
+            await handler(ws, request)
+            await ws.close()
         except Exception as e:
-            self._log.error(f"Param parsing error: {e}")
-        return params
+            self._log.error(f"WebSocket handler error: {e}")
+        finally:
+            self._websockets -= 1
+            self._streams -= 1
+        return False
+
+    async def _send_stream(self, writer, response: Response, keep_alive: bool,
+                           chunked: bool) -> bool:
+        """
+        Send an event stream, within the max_streams limit.
+
+        Args:
+            writer: uasyncio StreamWriter.
+            response: text/event-stream response (open until the client
+                goes away).
+            keep_alive: As for _send_response().
+            chunked: As for _send_response().
+
+        Returns:
+            True if the connection stays open after the stream ends.
+        """
+        if self._streams >= self._max_streams:
+            response.close()  # Unsubscribe
+            return await self._reject(writer, 503, "rejected")
+        self._streams += 1
+        try:
+            return await self._send_response(writer, response, keep_alive, chunked)
+        finally:
+            self._streams -= 1
+
+    async def _send_response(self, writer, response, keep_alive: bool,
+                             chunked: bool = False) -> bool:
+        """
+        Write a handler's response to the client.
+
+        Args:
+            writer: uasyncio StreamWriter.
+            response: Response or PreparedResponse instance, or complete
+                response bytes.
+            keep_alive: The client and limits allow reusing the connection.
+            chunked: The client accepts chunked transfer encoding
+                (HTTP/1.1), used for bodies of unknown length.
+
+        Returns:
+            True if the connection stays open. Raw bytes responses, and
+            bodies of unknown length without chunked encoding, are
+            delimited by closing it.
+        """
+        if isinstance(response, PreparedResponse):
+            await response.send(writer, keep_alive)
+            return keep_alive
+        if isinstance(response, Response):
+            chunked = chunked and not response.is_delimited()
+            keep_alive = keep_alive and (chunked or response.is_delimited())
+            await response.send(writer, keep_alive, chunked)
+            return keep_alive
+        writer.write(response)
+        await writer.drain()
+        return False
@@ -0,0 +1,227 @@
+"""
+Minimal RFC 6455 WebSocket support for WebServer.
+Handles the upgrade handshake, text/binary frames, ping/pong and close.
+"""
+import binascii
+import hashlib
+import uasyncio as asyncio
+
+# Handshake GUID from RFC 6455 section 1.3
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Opcodes
+WS_OP_CONTINUATION = 0x0
+WS_OP_TEXT = 0x1
+WS_OP_BINARY = 0x2
+WS_OP_CLOSE = 0x8
+WS_OP_PING = 0x9
+WS_OP_PONG = 0xA
+
+# Close status codes
+WS_CLOSE_NORMAL = 1000
+WS_CLOSE_GOING_AWAY = 1001
+WS_CLOSE_PROTOCOL_ERROR = 1002
+WS_CLOSE_TOO_BIG = 1009
+
+# Limits
+WS_MAX_MESSAGE = 1024         # Largest incoming payload (must fit the receive buffer)
+WS_SEND_QUEUE = 16            # Outgoing frames buffered per client, oldest dropped
+WS_MAX_CLIENTS = 2            # Concurrent WebSockets (each holds a connection)
+
+
+def accept_key(key: str) -> str:
+    """
+    Compute the Sec-WebSocket-Accept value for a handshake.
+
+    Args:
+        key: The client's Sec-WebSocket-Key header.
+
+    Returns:
+        Base64 SHA-1 of the key and WS_GUID.
+    """
+    digest = hashlib.sha1(key.encode() + WS_GUID).digest()
+    return binascii.b2a_base64(digest).decode().strip()
+
+
+def encode_frame(opcode: int, payload=b"") -> bytes:
+    """
+    Encode one unmasked, unfragmented server frame.
+
+    Args:
+        opcode: Frame opcode.
+        payload: Frame payload as bytes.
+
+    Returns:
+        Encoded frame.
+    """
+    n = len(payload)
+    if n < 126:
+        head = bytes((0x80 | opcode, n))
+    elif n < 65536:
+        head = bytes((0x80 | opcode, 126, n >> 8, n & 0xFF))
+    else:
+        head = bytes((0x80 | opcode, 127)) + n.to_bytes(8, "big")
+    return head + payload
+
+
+class WebSocket:
+    """
+    A server-side WebSocket over an upgraded HTTP connection.
+
+    Frames are parsed in place in the connection's receive buffer.
+    Outgoing messages are queued by send() and written together once per
+    event-loop tick with a single drain, so a burst of updates costs one
+    socket flush. If a client stops reading, the oldest queued frames are
+    dropped (counted in dropped) instead of blocking the sender.
+    """
+
+    def __init__(self, parser, writer, max_message: int = WS_MAX_MESSAGE,
+                 send_queue: int = WS_SEND_QUEUE):
+        """
+        Wrap an upgraded connection.
+
+        Args:
+            parser: The connection's RequestParser (owns the buffer).
+            writer: uasyncio StreamWriter.
+            max_message: Largest accepted incoming payload in bytes.
+            send_queue: Outgoing frames buffered before dropping.
+        """
+        self._parser = parser
+        self._writer = writer
+        self._max_message = max_message
+        self._send_queue = send_queue
+        self._pending = []
+        self._flush_task = None
+        self.closed = False
+        self.dropped = 0
+
+    async def receive(self):
+        """
+        Wait for the next text or binary message.
+
+        Pings are answered and pongs skipped; a close frame is echoed.
+
+        Returns:
+            str for text messages, bytes for binary ones, or None once
+            the connection is closed.
+        """
+        take = self._parser.take
+        while not self.closed:
+            head = await take(2)
+            if head is None:
+                self.closed = True
+                break
+            b0 = head[0]
+            b1 = head[1]
+            opcode = b0 & 0x0F
+            length = b1 & 0x7F
+
+            # Client frames must be masked; fragmented messages are not
+            # supported (dashboard commands are small)
+            if not b1 & 0x80 or opcode == WS_OP_CONTINUATION:
+                await self.close(WS_CLOSE_PROTOCOL_ERROR)
+                break
+            if length == 126:
+                ext = await take(2)
+                if ext is None:
+                    self.closed = True
+                    break
+                length = (ext[0] << 8) | ext[1]
+            elif length == 127:
+                length = self._max_message + 1
+            if length > self._max_message or not b0 & 0x80:
+                await self.close(WS_CLOSE_TOO_BIG)
+                break
+
+            mask = await take(4)
+            if mask is None:
+                self.closed = True
+                break
+            mask = bytes(mask)
+            payload = await take(length) if length else memoryview(b"")
+            if payload is None:
+                self.closed = True
+                break
+            for i in range(length):
+                payload[i] ^= mask[i & 3]
+
+            if opcode == WS_OP_TEXT:
+                return str(payload, "utf-8")
+            if opcode == WS_OP_BINARY:
+                return bytes(payload)
+            if opcode == WS_OP_PING:
+                self._queue(encode_frame(WS_OP_PONG, bytes(payload)))
+            elif opcode == WS_OP_CLOSE:
+                code = (payload[0] << 8) | payload[1] if length >= 2 else WS_CLOSE_NORMAL
+                await self.close(code)
+        return None
+
+    def send(self, message) -> None:
+        """
+        Queue a message for the next flush.
+
+        Args:
+            message: str (sent as text) or bytes (sent as binary).
+        """
+        if self.closed:
+            return
+        if isinstance(message, str):
+            self._queue(encode_frame(WS_OP_TEXT, message.encode()))
+        else:
+            self._queue(encode_frame(WS_OP_BINARY, bytes(message)))
+
+    def send_frame(self, frame: bytes) -> None:
+        """
+        Queue a frame encoded with encode_frame(), e.g. one shared by
+        several clients.
+
+        Args:
+            frame: Encoded frame.
+        """
+        if not self.closed:
+            self._queue(frame)
+
+    async def drain(self) -> None:
+        """Wait until all queued frames have been written."""
+        while self._pending or self._flush_task is not None:
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+            await self._flush_task
+
+    async def close(self, code: int = WS_CLOSE_NORMAL) -> None:
+        """
+        Send a close frame and stop sending.
+
+        Args:
+            code: Close status code.
+        """
+        if self.closed:
+            return
+        self._queue(encode_frame(WS_OP_CLOSE, bytes((code >> 8, code & 0xFF))))
+        self.closed = True
+        await self.drain()
+
+    def _queue(self, frame: bytes) -> None:
+        """Add a frame to the send queue and schedule a flush."""
+        if len(self._pending) >= self._send_queue:
+            self._pending.pop(0)
+            self.dropped += 1
+        self._pending.append(frame)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        """Write everything queued during this tick, then drain once."""
+        try:
+            await asyncio.sleep(0)
+            while self._pending:
+                frames = self._pending
+                self._pending = []
+                for frame in frames:
+                    self._writer.write(frame)
+                await self._writer.drain()
+        except OSError:
+            self.closed = True
+            self._pending = []
+        finally:
+            self._flush_task = None
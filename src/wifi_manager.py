@@ -2,23 +2,85 @@
 Core WiFi management system with state machine.
 Handles connection lifecycles, retries, and web-based provisioning.
 """
+import binascii
 import network
 import uasyncio as asyncio
 import time
-from config_manager import ConfigManager
-from dns_server import DNSServer
-from web_server import WebServer
+from config_manager import CLOCK_SET_AFTER, ConfigManager
+from dns_server import DNSServer, probe
+from web_server import EventStream, WebServer
 from provisioning import ProvisioningHandler
+from retry_policy import FixedDelay
+from scan_service import ScanService
 from constants import (
     WiFiState,
     STATE_IDLE, STATE_CONNECTING, STATE_CONNECTED, STATE_FAIL, STATE_AP_MODE
 )
 from config import WiFiConfig
-from logger import Logger
+from logger import Logger, LogLevel
 
 # AP activation timeout (in 100ms ticks)
 AP_ACTIVATION_TIMEOUT = 50  # 5 seconds
 
+# Station status polling while connecting: tight right after wlan.connect(),
+# doubling up to the maximum
+CONNECT_POLL_MIN_MS = 50
+CONNECT_POLL_MAX_MS = 500
+
+# Cached scan results used to learn the connected BSSID, in milliseconds
+# (access points rarely move, and a scan just for this would block)
+ASSOCIATION_SCAN_MAX_AGE = 10 * 60 * 1000
+
+# Known network ranking: score = RSSI (dBm) + these bonuses
+RANK_PRIORITY_DB = 10     # Per priority level
+RANK_SUCCESS_DB = 2       # Per recorded successful connection...
+RANK_SUCCESS_CAP = 5      # ...counting at most this many
+RANK_RECENT_DB = 5        # Network of the most recent success
+
+# Payload field names of events published on /events, by event
+EVENT_FIELDS = {
+    'connected': ('ip',),
+    'disconnected': (),
+    'state_change': ('old_state', 'new_state'),
+    'ap_mode_started': ('ssid',),
+    'connection_failed': ('retries',),
+}
+
+
+def rank_networks(known: list, scanned: list) -> list:
+    """
+    Order known networks by how likely a connection is to succeed.
+
+    Networks missing from the scan are left out, so no attempt is spent
+    on one that is out of range.
+
+    Args:
+        known: Known network dicts from ConfigManager.get_networks().
+        scanned: Scan results (dicts with 'ssid' and 'rssi').
+
+    Returns:
+        list: Known network dicts in range, best first.
+    """
+    rssi = {}
+    for net in scanned or ():
+        rssi[net["ssid"]] = net["rssi"]
+    latest = 0
+    for net in known:
+        latest = max(latest, net.get("last_success", 0))
+
+    ranked = []
+    for net in known:
+        if net["ssid"] not in rssi:
+            continue
+        score = (rssi[net["ssid"]]
+                 + net.get("priority", 0) * RANK_PRIORITY_DB
+                 + min(net.get("successes", 0), RANK_SUCCESS_CAP) * RANK_SUCCESS_DB)
+        if latest and net.get("last_success") == latest:
+            score += RANK_RECENT_DB
+        ranked.append((score, net))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return [net for _, net in ranked]
+
 
 class WiFiManager:
     """
@@ -85,8 +147,22 @@ class WiFiManager:
         self.dns_server = dns_server if dns_server else DNSServer(self._config.ap_ip)
         self.web_server = web_server if web_server else WebServer()
 
+        # Live events for web clients (Server-Sent Events on /events)
+        self.events = EventStream()
+        self.web_server.add_route("/events", self._handle_events)
+        Logger.add_hook(self._publish_log)
+
+        # Shared WiFi scan results (web interface and state machine)
+        self.scan_service = ScanService(
+            self.wlan,
+            on_results=self._on_scan_results
+        )
+
         # Provisioning handler
-        self._provisioning = ProvisioningHandler(self.web_server, wlan=self.wlan)
+        self._provisioning = ProvisioningHandler(
+            self.web_server, wlan=self.wlan, portal_ip=self._config.ap_ip,
+            scanner=self.scan_service, ap_ssid=self._config.ap_ssid
+        )
 
         # Internal state
         self._state = STATE_IDLE
@@ -94,6 +170,36 @@ class WiFiManager:
         self._target_password = None
         self._retry_count = 0
 
+        # Networks to try in order (None: rank known networks after a
+        # scan), the current one, and whether they come from the store
+        self._candidates = []
+        self._candidate = 0
+        self._known = False
+
+        # Retry waits/timeouts, and consecutive failures (persisted at
+        # powers of two so a reboot loop keeps backing off without a
+        # flash write per attempt)
+        self._retry_policy = self._config.retry_policy or FixedDelay(self._config.retry_delay)
+        self._failures = 0
+        self._boot_delay = 0
+
+        # Fast reconnect and time-to-IP measurement
+        self._connect_start = time.ticks_ms()
+        self._fast_tried = False
+        self._learn_bssid = False
+        self._connect_ms = None
+        self._connect_fast = False
+
+        # IP configuration: 'dhcp', 'static' or 'lease' (reused DHCP address)
+        self._ip_source = None
+        self._dhcp_off = False
+        self._lease_deadline = None
+        self._lease_saved = None  # ticks_ms() when this uptime saved a lease
+
+        # Set by connect(), disconnect() and enter_ap_mode() to interrupt
+        # the state handler's current wait
+        self._wake = asyncio.Event()
+
         # Event listeners: event_name -> list of callbacks
         self._listeners = {
             'connected': [],
@@ -135,10 +241,17 @@ class WiFiManager:
                 self._emit('connection_failed', self._retry_count)
 
     async def _run_state_machine(self) -> None:
-        """Main asynchronous loop for WiFi state transitions."""
+        """
+        Main asynchronous loop for WiFi state transitions.
+
+        Each handler returns when its state needs re-evaluating: after a
+        transition, or when a public call sets the wake event. Waits inside
+        handlers go through _wait(), so commands are acted on immediately.
+        """
         self._log.info("State machine started")
         self._load_and_connect()
         while True:
+            self._wake.clear()
             try:
                 if self._state == STATE_IDLE:
                     await self._handle_idle()
@@ -152,15 +265,38 @@ class WiFiManager:
                     await self._handle_ap_mode()
             except Exception as e:
                 self._log.error(f"State machine error: {e}")
-                await asyncio.sleep(5)
-            await asyncio.sleep(0.1)
+                await self._wait(5)
+
+    async def _wait(self, timeout: float) -> bool:
+        """
+        Sleep until the timeout expires or the wake event is set.
+
+        Args:
+            timeout: Seconds to wait at most.
+
+        Returns:
+            bool: True if woken by a command, False on timeout.
+        """
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
     def _load_and_connect(self) -> None:
         """Attempt to load credentials and start connection sequence."""
-        ssid, password = ConfigManager.get_wifi_credentials()
-        if ssid:
-            self._log.info(f"Found config for '{ssid}'")
-            self.connect(ssid, password)
+        networks = ConfigManager.get_networks()
+        if networks:
+            if len(networks) == 1:
+                self._log.info(f"Found config for '{networks[0]['ssid']}'")
+                self.connect(networks[0]["ssid"], networks[0]["password"])
+            else:
+                self._log.info(f"Found config for {len(networks)} networks")
+                self.connect_known()
+            self._failures = ConfigManager.get_failures()
+            # A fixed delay is not a backoff; only growing policies wait at boot
+            if self._failures and type(self._retry_policy) is not FixedDelay:
+                self._boot_delay = self._retry_policy.delay(self._failures)
         else:
             self._log.info("No config found, entering AP mode")
             self._set_state(STATE_AP_MODE)
@@ -170,22 +306,73 @@ class WiFiManager:
         Handle IDLE state - waiting for explicit connect() call.
         This state is entered after disconnect() is called.
         """
-        await asyncio.sleep(1)
+        await self._wake.wait()
 
     async def _handle_connecting(self) -> None:
         """Manage connection attempts and retries."""
         self._stop_ap_services()
 
-        self._log.info(f"Connecting to '{self._target_ssid}' (attempt {self._retry_count + 1}/{self._config.max_retries})")
-        self.wlan.connect(self._target_ssid, self._target_password)
+        if self._boot_delay:
+            # Failures before the reboot still count
+            delay = self._boot_delay
+            self._boot_delay = 0
+            self._log.info(f"Backing off {delay:.1f}s after {self._failures} failed attempts")
+            if await self._wait(delay):
+                return
+            self._connect_start = time.ticks_ms()
+
+        last_good = self._fast_candidate()
+        if last_good is None and self._candidates is None:
+            # One scan decides which known networks to try, in which order;
+            # cached results will do for the first pass, not after a failure
+            scanned = await self.scan_service.scan(0 if self._retry_count else None)
+            if self._wake.is_set():
+                return  # A command replaced the target during the scan
+            known = ConfigManager.get_networks()
+            self._candidates = rank_networks(known, scanned)
+            self._candidate = 0
+            if not self._candidates:
+                # Hidden SSIDs are not listed, and a failed scan lists
+                # nothing: try every known network, by priority
+                self._log.info("No known network found by scan, trying all")
+                self._candidates = known
+            if not self._candidates:
+                await self._attempt_failed()
+                return
+            self._set_target(self._candidates[0])
+            self._log.info(f"Networks in range: {[net['ssid'] for net in self._candidates]}")
+        lease = self._apply_ip_config()
+        self._fast_tried = True
+        if last_good:
+            self._log.info(f"Connecting to '{self._target_ssid}' via cached AP {last_good['bssid']} (channel {last_good['channel']})")
+            self._connect_cached(last_good)
+            timeout = self._config.fast_connect_timeout
+        else:
+            self._log.info(f"Connecting to '{self._target_ssid}' (attempt {self._retry_count + 1}/{self._config.max_retries})")
+            self.wlan.connect(self._target_ssid, self._target_password)
+            timeout = self._retry_policy.connect_timeout(self._retry_count + 1, self._config.connect_timeout)
 
-        start_time = time.time()
-        while (time.time() - start_time) < self._config.connect_timeout:
+        start = time.ticks_ms()
+        interval = CONNECT_POLL_MIN_MS
+        while time.ticks_diff(time.ticks_ms(), start) < timeout * 1000:
             if self.wlan.isconnected():
+                await self._finish_ip_config(lease)
+                if self._wake.is_set():
+                    # A command arrived during the lease probe; this link
+                    # may be for a stale target, so drop it and start over
+                    self.wlan.disconnect()
+                    return
+                self._connect_ms = time.ticks_diff(time.ticks_ms(), self._connect_start)
+                self._connect_fast = last_good is not None
                 ip = self.wlan.ifconfig()[0]
-                self._log.info(f"Connected! IP: {ip}")
+                self._log.info(f"Connected! IP: {ip} ({self._connect_ms} ms{', cached AP' if last_good else ''}, {self._ip_source})")
                 self._set_state(STATE_CONNECTED)
                 self._retry_count = 0
+                # Clear the stored count even if connect() already reset
+                # it in RAM (no write if the file holds none)
+                self._failures = 0
+                ConfigManager.set_failures(0)
+                self._remember_association(last_good["bssid"] if last_good else None)
                 return
 
             status = self.wlan.status()
@@ -193,15 +380,244 @@ class WiFiManager:
             if status == network.STAT_CONNECT_FAIL or status == network.STAT_NO_AP_FOUND or status == network.STAT_WRONG_PASSWORD:
                 self._log.debug(f"Connection failed with status {status}")
                 break
-            await asyncio.sleep(0.5)
+            if await self._wait(interval / 1000):
+                # Interrupted by a command (new target, disconnect, AP mode)
+                if self._state != STATE_CONNECTING:
+                    self.wlan.disconnect()
+                return
+            interval = min(interval * 2, CONNECT_POLL_MAX_MS)
 
+        if last_good:
+            # The AP may have moved or been replaced: forget it and fall
+            # back to a normal connect right away (not counted as a retry)
+            self._log.info("Cached AP failed, falling back to normal connect")
+            self.wlan.disconnect()
+            ConfigManager.clear_last_good()
+            return
+
+        if self._candidates and self._candidate + 1 < len(self._candidates):
+            # Fail over down the list without a retry delay; a retry is
+            # only counted once every candidate has failed
+            self._candidate += 1
+            self._set_target(self._candidates[self._candidate])
+            self._log.info(f"Failing over to '{self._target_ssid}'")
+            self.wlan.disconnect()
+            return
+
+        await self._attempt_failed()
+
+    async def _attempt_failed(self) -> None:
+        """Count a failed attempt, then back off or enter FAIL."""
+        self._candidate = 0
+        if self._known:
+            self._candidates = None  # Scan and rank again
+        elif self._candidates:
+            self._set_target(self._candidates[0])
         self._retry_count += 1
+        self._failures += 1
+        if not self._failures & (self._failures - 1):
+            ConfigManager.set_failures(self._failures)
         if self._retry_count >= self._config.max_retries:
             self._log.warning("Max retries reached")
             self._set_state(STATE_FAIL)
         else:
             self.wlan.disconnect()
-            await asyncio.sleep(self._config.retry_delay)
+            delay = self._retry_policy.delay(self._failures)
+            self._log.debug(f"Retrying in {delay:.1f}s")
+            await self._wait(delay)
+
+    def _set_target(self, network: dict) -> None:
+        """Make a known network dict the connection target."""
+        self._target_ssid = network["ssid"]
+        self._target_password = network["password"]
+
+    def _fast_candidate(self) -> dict:
+        """
+        Get the cached association to try on the first attempt.
+
+        Returns:
+            dict: Last-good association for the target SSID, or None if
+                  fast reconnect is disabled, was already tried for this
+                  connection, or nothing is cached.
+        """
+        if (not self._config.fast_reconnect or self._fast_tried
+                or self._retry_count or self._target_ssid is None):
+            return None
+        return ConfigManager.get_last_good(self._target_ssid)
+
+    def _apply_ip_config(self) -> dict:
+        """
+        Set a static address before connecting, if one applies.
+
+        A configured static IP is applied on every attempt. Otherwise, with
+        reuse_lease, the saved DHCP address is applied on the first attempt
+        while it is younger than lease_lifetime (see _lease_age()). lwIP
+        announces the address with a gratuitous ARP when the link comes up.
+
+        Returns:
+            dict: The applied lease (verified after association), or None.
+        """
+        if self._config.static_ip:
+            self.wlan.ifconfig(tuple(self._config.static_ip))
+            self._dhcp_off = True
+            return None
+        if not self._config.reuse_lease or self._fast_tried or self._retry_count:
+            return None
+        lease = ConfigManager.get_lease(self._target_ssid)
+        if not lease:
+            return None
+        age = self._lease_age(lease)
+        if age is None or not 0 <= age < self._config.lease_lifetime:
+            return None
+        self._log.debug(f"Reusing lease {lease['ifconfig'][0]} ({age:.0f}s old)")
+        self.wlan.ifconfig(tuple(lease["ifconfig"]))
+        self._dhcp_off = True
+        lease["remaining"] = self._config.lease_lifetime - age
+        return lease
+
+    def _lease_age(self, lease: dict) -> float:
+        """
+        Get the age of a saved lease.
+
+        Wall-clock age is used while the clock is set (the lease was saved
+        and is read with a set clock). Otherwise only a lease saved during
+        this uptime has a known age, from the ticks counter.
+
+        Args:
+            lease: Lease from ConfigManager.get_lease().
+
+        Returns:
+            float: Age in seconds (negative if the clock went backwards),
+                   or None if unknown.
+        """
+        now = time.time()
+        if lease.get("time") is not None and now >= CLOCK_SET_AFTER:
+            return now - lease["time"]
+        if self._lease_saved is not None:
+            return time.ticks_diff(time.ticks_ms(), self._lease_saved) / 1000
+        return None
+
+    def _save_lease(self) -> None:
+        """Save the current DHCP address and note when, for _lease_age()."""
+        if ConfigManager.save_lease(self._target_ssid, self.wlan.ifconfig()):
+            self._lease_saved = time.ticks_ms()
+
+    async def _finish_ip_config(self, lease: dict) -> None:
+        """
+        Settle the address once the link is up.
+
+        A reused lease is kept if its DNS server (normally the gateway)
+        answers a probe; otherwise it is dropped and DHCP takes over. An
+        address left over from an earlier lease attempt is replaced by DHCP.
+
+        Args:
+            lease: Lease applied by _apply_ip_config(), or None.
+        """
+        self._lease_deadline = None
+        if self._config.static_ip:
+            self._ip_source = 'static'
+            return
+        if lease:
+            if await probe(lease["ifconfig"][3]):
+                self._ip_source = 'lease'
+                self._lease_deadline = time.ticks_add(time.ticks_ms(), int(lease["remaining"] * 1000))
+                return
+            self._log.info("Reused lease not answering, falling back to DHCP")
+            ConfigManager.clear_lease()
+            self._lease_saved = None
+        if self._dhcp_off:
+            self._restore_dhcp()
+        else:
+            self._ip_source = 'dhcp'
+            if self._config.reuse_lease:
+                self._save_lease()
+
+    def _restore_dhcp(self) -> None:
+        """
+        Switch the station interface back to DHCP.
+
+        On lwIP ports wlan.ifconfig('dhcp') blocks until an address is
+        bound, which is quick while associated.
+        """
+        self.wlan.ifconfig('dhcp')
+        self._dhcp_off = False
+        self._lease_deadline = None
+        self._ip_source = 'dhcp'
+        if self._config.reuse_lease:
+            self._save_lease()
+
+    def _connect_cached(self, last_good: dict) -> None:
+        """Start a connection pinned to a cached BSSID (and channel)."""
+        bssid = binascii.unhexlify(last_good["bssid"])
+        channel = last_good.get("channel")
+        if channel:
+            try:
+                self.wlan.connect(self._target_ssid, self._target_password,
+                                  bssid=bssid, channel=channel)
+                return
+            except TypeError:
+                pass  # Firmware without the channel argument
+        self.wlan.connect(self._target_ssid, self._target_password, bssid=bssid)
+
+    def _remember_association(self, bssid: str = None) -> None:
+        """
+        Record the successful connection, with its BSSID and channel.
+
+        The channel is read from the driver. The cyw43 driver cannot
+        report the BSSID, so unless it is known (the connection was
+        pinned to it) it is taken from cached scan results. Without
+        recent results one background scan is started and the BSSID is
+        learned from its results (see _on_scan_results()).
+
+        Args:
+            bssid: BSSID the connection was pinned to, as a hex string.
+        """
+        if not self._config.fast_reconnect:
+            ConfigManager.record_success(self._target_ssid)
+            return
+        channel = None
+        if bssid is None:
+            try:
+                bssid = binascii.hexlify(self.wlan.config('bssid')).decode()
+            except (ValueError, OSError, TypeError):
+                pass
+        try:
+            channel = self.wlan.config('channel')
+        except (ValueError, OSError, TypeError):
+            pass
+        if bssid is None:
+            bssid, scan_channel = self._find_bssid(self.scan_service.cached(ASSOCIATION_SCAN_MAX_AGE))
+            if channel is None:
+                channel = scan_channel
+            self._learn_bssid = bssid is None
+            if self._learn_bssid:
+                self.scan_service.refresh()
+        ConfigManager.record_success(self._target_ssid, bssid, channel)
+
+    def _find_bssid(self, networks: list) -> tuple:
+        """
+        Look up the target network in scan results.
+
+        Args:
+            networks: Scan results, or None.
+
+        Returns:
+            tuple: (bssid, channel) of its strongest access point, or
+                   (None, None) if it is not listed.
+        """
+        for net in networks or ():
+            if net["ssid"] == self._target_ssid:
+                return (net["bssid"], net["channel"])
+        return (None, None)
+
+    def _on_scan_results(self, networks: list) -> None:
+        """Publish scan results and learn a still unknown BSSID from them."""
+        self.events.publish('scan', networks)
+        if self._learn_bssid and self._state == STATE_CONNECTED:
+            bssid, channel = self._find_bssid(networks)
+            if bssid:
+                self._learn_bssid = False
+                ConfigManager.record_success(self._target_ssid, bssid, channel, count=False)
 
     async def _handle_connected(self) -> None:
         """Monitor connection health when connected."""
@@ -209,17 +625,23 @@ class WiFiManager:
             self._log.warning("Connection lost, reconnecting...")
             self.wlan.disconnect()
             self._retry_count = 0
+            if self._known:
+                self._candidates = None  # Fast path to this one, else rescan
+            self._begin_connect()
             self._set_state(STATE_CONNECTING)
         else:
-            await asyncio.sleep(self._config.health_check_interval)
+            # A reused lease is never renewed by the router: take a fresh
+            # one via DHCP before the saved one runs out
+            if self._lease_deadline is not None and time.ticks_diff(time.ticks_ms(), self._lease_deadline) >= 0:
+                self._log.info("Reused lease expiring, renewing via DHCP")
+                self._restore_dhcp()
+            await self._wait(self._config.health_check_interval)
 
     async def _handle_fail(self) -> None:
         """Handle failure state with recovery delay, then enter AP mode."""
         self._log.info(f"Cooldown {self._config.fail_recovery_delay}s before AP mode")
-        for _ in range(self._config.fail_recovery_delay):
-            if self._state != STATE_FAIL:
-                return
-            await asyncio.sleep(1)
+        if await self._wait(self._config.fail_recovery_delay):
+            return
         self._retry_count = 0
         self._set_state(STATE_AP_MODE)
 
@@ -243,11 +665,18 @@ class WiFiManager:
             current_ip = self.ap.ifconfig()[0]
             self._log.info(f"AP active at {current_ip}")
 
+            # Changing the IP also invalidates cached DNS answers and
+            # re-encodes the captive probe redirect
             self.dns_server.ip_address = current_ip
+            self._provisioning.portal_ip = current_ip
             self.dns_server.start()
             await self.web_server.start(host='0.0.0.0', port=80)
 
-        await asyncio.sleep(2)
+            # Warm the scan cache before the first client asks for it
+            self.scan_service.refresh()
+
+        # Nothing to do until a command arrives
+        await self._wake.wait()
 
     def _stop_ap_services(self) -> None:
         """Ensure AP and its services are stopped."""
@@ -265,10 +694,55 @@ class WiFiManager:
             ssid: WiFi network name.
             password: WiFi password.
         """
+        if ssid != self._target_ssid:
+            self._failures = 0
         self._target_ssid = ssid
         self._target_password = password
+        self._candidates = [{"ssid": ssid, "password": password}]
+        self._candidate = 0
+        self._known = False
+        self._retry_count = 0
+        self._begin_connect()
+        self._set_state(STATE_CONNECTING)
+        self._wake.set()
+
+    def connect_known(self) -> bool:
+        """
+        Connect to the best known network in range.
+
+        The network of the last successful connection is tried first via
+        its cached access point, without scanning. Otherwise one scan
+        ranks the known networks by RSSI, priority and past successes
+        (see rank_networks()), and each network in range is tried once,
+        best first, before a retry is counted. If the scan fails or finds
+        none of them (e.g. hidden SSIDs), all are tried by priority.
+
+        Returns:
+            bool: False if no networks are configured.
+        """
+        networks = ConfigManager.get_networks()
+        if not networks:
+            return False
+        last = ConfigManager.get_last_good()
+        self._target_ssid = None
+        self._target_password = None
+        for network in networks:
+            if last and network["ssid"] == last["ssid"]:
+                self._set_target(network)
+        self._candidates = None
+        self._candidate = 0
+        self._known = True
         self._retry_count = 0
+        self._begin_connect()
         self._set_state(STATE_CONNECTING)
+        self._wake.set()
+        return True
+
+    def _begin_connect(self) -> None:
+        """Start timing a new connection and allow a fast first attempt."""
+        self._connect_start = time.ticks_ms()
+        self._fast_tried = False
+        self._learn_bssid = False
 
     def disconnect(self) -> None:
         """Disconnect from WiFi and enter IDLE state."""
@@ -277,6 +751,7 @@ class WiFiManager:
         self._set_state(STATE_IDLE)
         self._retry_count = 0
         self._stop_ap_services()
+        self._wake.set()
 
     def enter_ap_mode(self) -> None:
         """Manually enter AP provisioning mode."""
@@ -284,6 +759,7 @@ class WiFiManager:
         if self.wlan.isconnected():
             self.wlan.disconnect()
         self._set_state(STATE_AP_MODE)
+        self._wake.set()
 
     def is_connected(self) -> bool:
         """Check if currently connected to WiFi."""
@@ -301,6 +777,17 @@ class WiFiManager:
         """Get current IP configuration (ip, subnet, gateway, dns)."""
         return self.wlan.ifconfig()
 
+    def get_connect_time(self) -> tuple:
+        """
+        Get the duration of the last successful connection.
+
+        Returns:
+            tuple: (milliseconds from connect() to an IP address, True if
+                   the cached access point was used), or (None, False)
+                   before the first connection.
+        """
+        return (self._connect_ms, self._connect_fast)
+
     def get_ap_config(self) -> tuple:
         """
         Get AP mode configuration for external display.
@@ -330,7 +817,11 @@ class WiFiManager:
             "state": self._state,
             "target_ssid": self._target_ssid,
             "retry_count": self._retry_count,
+            "failures": self._failures,
             "max_retries": self._config.max_retries,
+            "connect_ms": self._connect_ms,
+            "fast_connect": self._connect_fast,
+            "ip_source": self._ip_source,
             "wlan_status": None,
             "wlan_rssi": None,
             "wlan_connected": False,
@@ -423,3 +914,23 @@ class WiFiManager:
                 callback(*args)
             except Exception as e:
                 self._log.error(f"Event callback error ({event}): {e}")
+
+        if len(self.events):
+            data = dict(zip(EVENT_FIELDS.get(event, ()), args))
+            if event == 'state_change':
+                data['name'] = WiFiState.get_name(args[1])
+            self.events.publish(event, data)
+
+    def _publish_log(self, level: int, module: str, msg: str) -> None:
+        """Forward log messages to /events subscribers (Logger hook)."""
+        if len(self.events):
+            name = Logger._level_names[level] if level <= LogLevel.ERROR else '?'
+            self.events.publish('log', {'level': name, 'module': module, 'msg': msg})
+
+    async def _handle_events(self, request):
+        """Stream live events, starting with the current state."""
+        return self.events.response('state', {
+            'state': self._state,
+            'name': WiFiState.get_name(self._state),
+            'ssid': self._target_ssid,
+        })